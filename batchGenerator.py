@@ -0,0 +1,113 @@
+# Batch generator - generates many puzzles of one difficulty across all cores
+
+# Usage: python batchGenerator.py Hard -n 10000 -o hard.txt [--budget 0.05]
+# Each output line is the puzzle as 81 digits (0 for an empty square), the guess count and the level.
+# With --budget no puzzle takes much longer than that many seconds; the closest puzzle found in time is written
+# instead, with the level it was rated at. A budget shorter than one grid takes to fill is still overrun by a little
+# (see sudokuGenerator.streamGen), so that a real puzzle is written rather than a solved grid.
+# With --unique puzzles equivalent to one already written (see puzzleIndex.py) are dropped, so fewer than --count
+# lines may be written.
+# Throughput, rejection rate and latency percentiles are printed to stderr when the batch finishes.
+
+import argparse
+import functools
+import itertools
+import multiprocessing
+import random
+import sys
+import time
+import puzzleIndex
+import sudokuGenerator
+import sudokuSolver
+
+LEVELS = sudokuGenerator.LEVELS
+
+def generateOne(level, budget=None, unique=False):
+    """ Generates one puzzle of the given level with sudokuGenerator.targetedGen, taking at most budget seconds if
+        it is given. Returns the puzzle line, the number of rejected grids, the latency and, if unique is True,
+        the canonical key of the puzzle (None otherwise)"""
+    t1 = time.perf_counter()
+    stats = {}
+    if budget is None:
+        s = sudokuGenerator.targetedGen(level, stats = stats)
+    else:
+        s = sudokuGenerator.targetedGen(level, None, stats, deadline = time.monotonic() + budget)
+    grid = sudokuSolver.gridFromCells(s[0])
+    line = ''.join(str(v) for v in grid) + ' ' + str(s[1]) + ' ' + s[2]
+    key = puzzleIndex.canonicalKey(grid) if unique else None
+    return line, stats['grids'] - 1, time.perf_counter() - t1, key
+
+def percentile(values, p):
+    """ Returns the p-th percentile of a sorted list by the nearest rank method"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(p / 100.0 * len(values))) - 1))]
+
+def seedWorker():
+    # Forked workers inherit the parent's random state, so each one reseeds from the OS
+    random.seed()
+
+def run(level, count, out, processes=None, report=sys.stderr, budget=None, unique=False):
+    """ Generates count puzzles of level on a process pool, writing each line to out as soon as it is finished.
+        Returns a dict of statistics for the batch. budget is the time limit in seconds for each puzzle. If
+        unique is True, workers also canonicalize their puzzles and equivalent puzzles are only written once"""
+    t1 = time.perf_counter()
+    latencies = []
+    rejected = 0
+    index = puzzleIndex.puzzleIndex()
+    duplicates = 0
+    pool = multiprocessing.Pool(processes, initializer=seedWorker)
+    try:
+        for line, r, latency, key in pool.imap_unordered(functools.partial(generateOne, budget=budget, unique=unique),
+                                                         itertools.repeat(level, count)):
+            rejected += r
+            latencies.append(latency)
+            if key is not None and not index.add(None, key):
+                duplicates += 1
+                continue
+            out.write(line + '\n')
+            out.flush()
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - t1
+    latencies.sort()
+    stats = {
+        'level': level,
+        'puzzles': count,
+        'seconds': elapsed,
+        'throughput': count / elapsed if elapsed else 0.0,
+        'rejection': rejected / float(rejected + count) if count else 0.0,
+        'p50': percentile(latencies, 50),
+        'p90': percentile(latencies, 90),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else 0.0,
+        'duplicates': duplicates
+    }
+    if report is not None:
+        report.write('%d %s puzzles in %.2f s (%.1f puzzles/s)\n' % (count, level, elapsed, stats['throughput']))
+        report.write('Rejection rate: %.1f%%\n' % (100 * stats['rejection']))
+        report.write('Latency p50 %.4f s, p90 %.4f s, p99 %.4f s, max %.4f s\n' %
+                     (stats['p50'], stats['p90'], stats['p99'], stats['max']))
+        if unique:
+            report.write('Duplicates dropped: %d\n' % duplicates)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generates a batch of sudoku puzzles of one difficulty')
+    parser.add_argument('level', choices=LEVELS)
+    parser.add_argument('-n', '--count', type=int, default=100, help='number of puzzles to generate')
+    parser.add_argument('-o', '--output', help='file to write puzzles to (default: stdout)')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('-b', '--budget', type=float, default=None, help='time limit in seconds for each puzzle')
+    parser.add_argument('-u', '--unique', action='store_true', help='drop puzzles equivalent to one already written')
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            run(args.level, args.count, out, args.processes, budget=args.budget, unique=args.unique)
+    else:
+        run(args.level, args.count, sys.stdout, args.processes, budget=args.budget, unique=args.unique)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
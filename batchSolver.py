@@ -0,0 +1,133 @@
+# Batch solver - solves and rates a stream of puzzles across all cores
+
+# Usage: python batchSolver.py puzzles.txt -o rated.txt [--engine cell]
+#        cat puzzles.txt | python batchSolver.py > rated.txt
+# Input has one puzzle per line as 81 characters, with 0 or . for an empty square. Anything after the first
+# whitespace on a line is ignored, as are blank lines and lines starting with #.
+# Each output line is the puzzle, its solution, the guess count and the level. Puzzles that are not 81 squares
+# are written with - as the solution and Invalid as the level, and puzzles with no solution with Unsolvable.
+# Puzzles are read and solved in chunks, and only a few chunks per worker are in flight at once, so memory use
+# stays the same however long the input is. Lines are written as chunks finish, so the output is not in input
+# order. Throughput is printed to stderr when the input runs out.
+
+import argparse
+import itertools
+import multiprocessing
+import sys
+import threading
+import time
+import sudokuGenerator
+import sudokuSolver
+from batchGenerator import seedWorker
+
+def parse(puzzle):
+    """ Returns the flat grid of ints for a puzzle string, or None if it is not a puzzle of 81 squares"""
+    digits = puzzle.replace('.', '0')
+    if len(digits) != 81 or not digits.isdigit():
+        return None
+    return [int(c) for c in digits]
+
+def solveLine(line, engine=None):
+    """ Solves and rates one puzzle line with sudokuGenerator.solve. Returns the output line and the level"""
+    puzzle = line.split()[0]
+    grid = parse(puzzle)
+    if grid is None:
+        return puzzle + ' - 0 Invalid', 'Invalid'
+    # The cell solver can take minutes to give up on a puzzle with no solution, so those are found with the
+    # bitmask search first
+    if not sudokuGenerator.isBitmask(engine) and sudokuSolver.count_solutions(grid, 1) == 0:
+        return puzzle + ' - 0 Unsolvable', 'Unsolvable'
+    s = sudokuGenerator.solve(sudokuGenerator.cellsFromGrid(grid), engine = engine)
+    if s == False:
+        return puzzle + ' - 0 Unsolvable', 'Unsolvable'
+    solution = ''.join(str(v) for v in sudokuSolver.gridFromCells(s[0]))
+    return puzzle + ' ' + solution + ' ' + str(s[1]) + ' ' + s[2], s[2]
+
+def solveChunk(lines, engine=None):
+    return [solveLine(line, engine) for line in lines]
+
+def puzzleLines(f):
+    """ Yields the puzzle lines of a file, skipping blank lines and comments"""
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+def chunks(lines, size):
+    """ Yields lists of up to size lines without reading further ahead than one chunk"""
+    while True:
+        chunk = list(itertools.islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+def run(infile, out, processes=None, engine=None, chunk=256, report=sys.stderr):
+    """ Solves every puzzle line of infile on a process pool, writing each result line to out. At most two chunks
+        per worker are queued or being solved at once. Returns a dict of statistics for the batch"""
+    processes = processes or multiprocessing.cpu_count()
+    t1 = time.perf_counter()
+    levels = {}
+    inFlight = threading.BoundedSemaphore(2 * processes)
+    errors = []
+
+    # Callbacks run on the pool's result thread, one at a time
+    def finished(results):
+        for line, level in results:
+            out.write(line + '\n')
+            levels[level] = levels.get(level, 0) + 1
+        out.flush()
+        inFlight.release()
+
+    def failed(error):
+        errors.append(error)
+        inFlight.release()
+
+    pool = multiprocessing.Pool(processes, initializer=seedWorker)
+    try:
+        for lines in chunks(puzzleLines(infile), chunk):
+            inFlight.acquire()
+            if errors:
+                break
+            pool.apply_async(solveChunk, (lines, engine), callback=finished, error_callback=failed)
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()
+    if errors:
+        raise errors[0]
+    elapsed = time.perf_counter() - t1
+    count = sum(levels.values())
+    stats = {
+        'puzzles': count,
+        'seconds': elapsed,
+        'throughput': count / elapsed if elapsed else 0.0,
+        'levels': levels
+    }
+    if report is not None:
+        report.write('%d puzzles in %.2f s (%.1f puzzles/s)\n' % (count, elapsed, stats['throughput']))
+        for level in sudokuGenerator.LEVELS + ['Unsolvable', 'Invalid']:
+            if level in levels:
+                report.write('%s: %d\n' % (level, levels[level]))
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solves and rates a file of sudoku puzzles, one per line')
+    parser.add_argument('input', nargs='?', help='file of puzzles (default: stdin)')
+    parser.add_argument('-o', '--output', help='file to write results to (default: stdout)')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--engine', default=sudokuGenerator.defaultEngine, choices=['bitmask', 'cell'])
+    parser.add_argument('--chunk', type=int, default=256, help='puzzles sent to a worker at a time')
+    args = parser.parse_args(argv)
+
+    infile = open(args.input) if args.input else sys.stdin
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        run(infile, out, args.processes, args.engine, args.chunk)
+    finally:
+        if args.input:
+            infile.close()
+        if args.output:
+            out.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,171 @@
+# Benchmark suite - times puzzle generation and solving with fixed seeds and writes the results as JSON
+
+# Usage: python benchmark.py [--engine cell] [--runs 20] [--output results.json] [--baseline old.json]
+# Every run of a case is seeded with seed + run number, so two benchmark runs time exactly the same work.
+# With --baseline the median of every case is compared against an earlier results file, and the exit
+# status is 1 if any case got slower by more than --tolerance.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import gridBatch
+import sudokuGenerator
+import sudokuSolver
+from batchGenerator import percentile
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hardPuzzles.txt')
+
+# Functions whose calls are counted during every case. Generators and solvers call these through their module,
+# so retries (new grids, extra digs) and recursion (solver restarts, solve giving up) are all counted
+COUNTED = [(sudokuSolver, 'randomGrid', 'grids'), (sudokuGenerator, 'sudokuGen', 'grids'),
+           (sudokuGenerator, 'puzzleGen', 'digs'), (sudokuGenerator, 'solve', 'solves'),
+           (sudokuGenerator, 'solver', 'solverCalls')]
+
+class callCounter(object):
+    """ Wraps the COUNTED functions for the length of a with block and counts their calls. Calls to solve that
+        return False are counted as solveFailures"""
+    def __init__(self):
+        self.counts = {}
+
+    def wrap(self, module, name, key):
+        original = getattr(module, name)
+        def counted(*args, **kwargs):
+            self.counts[key] = self.counts.get(key, 0) + 1
+            result = original(*args, **kwargs)
+            if name == 'solve' and result == False:
+                self.counts['solveFailures'] = self.counts.get('solveFailures', 0) + 1
+            return result
+        return original, counted
+
+    def __enter__(self):
+        self.originals = []
+        for module, name, key in COUNTED:
+            original, counted = self.wrap(module, name, key)
+            self.originals.append((module, name, original))
+            setattr(module, name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, original in self.originals:
+            setattr(module, name, original)
+
+def loadCorpus(path=CORPUS):
+    """ Returns (name, grid) for every puzzle in the corpus file"""
+    puzzles = []
+    with open(path) as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                digits, name = line.split()[:2]
+                puzzles.append((name, [int(c) for c in digits]))
+    return puzzles
+
+def timeCase(runs, seed, setup, run):
+    """ Runs a case runs times and returns its latency percentiles, summed call counts and peak memory. setup
+        makes the arguments for run and is not timed. One more untimed run is traced for peak memory"""
+    latencies = []
+    counts = {}
+    for r in range(runs):
+        random.seed(seed + r)
+        args = setup()
+        with callCounter() as counter:
+            t1 = time.perf_counter()
+            run(*args)
+            latencies.append(time.perf_counter() - t1)
+        for key in counter.counts:
+            counts[key] = counts.get(key, 0) + counter.counts[key]
+    random.seed(seed)
+    args = setup()
+    tracemalloc.start()
+    run(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies.sort()
+    return {
+        'runs': runs,
+        'mean': sum(latencies) / runs,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1],
+        'peakBytes': peak,
+        'counts': counts
+    }
+
+def runAll(engine, runs, seed, only=None, corpus=CORPUS, report=sys.stderr):
+    """ Runs every case with the given engine and returns the results as a dict ready for JSON. If only is a list
+        of names, only cases whose name starts with one of them are run"""
+    # The counting wrappers double the depth of the cell solver's recursion
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    cases = [
+        ('perfectSudoku', lambda: (), lambda: sudokuGenerator.perfectSudoku(engine)),
+        ('puzzleGen', lambda: (sudokuGenerator.perfectSudoku(engine),), lambda p: sudokuGenerator.puzzleGen(p, engine)),
+        ('gridBatch:1024', lambda: (random.getrandbits(32),), lambda seed: gridBatch.randomGrids(1024, seed))
+    ]
+    for name, grid in loadCorpus(corpus):
+        cases.append(('solve:' + name, lambda grid=grid: (sudokuGenerator.cellsFromGrid(grid),),
+                      lambda s: sudokuGenerator.solve(s, engine = engine)))
+    for level in sudokuGenerator.LEVELS:
+        cases.append(('main:' + level, lambda: (),
+                      lambda level=level: sudokuGenerator.main(level, engine, verbose = False)))
+    results = {}
+    for name, setup, run in cases:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = timeCase(runs, seed, setup, run)
+        if report is not None:
+            r = results[name]
+            report.write('%-22s p50 %9.5f s  p95 %9.5f s  p99 %9.5f s  peak %8d B  %s\n' %
+                         (name, r['p50'], r['p95'], r['p99'], r['peakBytes'], r['counts']))
+    return {
+        'engine': engine,
+        'runs': runs,
+        'seed': seed,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': results
+    }
+
+def compare(results, baseline, tolerance, report=sys.stderr):
+    """ Compares the median of every case against a baseline result dict. Returns the names of the cases
+        that got slower by more than tolerance (0.2 is 20 percent)"""
+    slower = []
+    for name, r in results['cases'].items():
+        if name not in baseline['cases']:
+            continue
+        old = baseline['cases'][name]['p50']
+        ratio = r['p50'] / old if old else 1.0
+        if ratio > 1 + tolerance:
+            slower.append(name)
+        report.write('%-22s %6.2fx%s\n' % (name, ratio, '  REGRESSION' if ratio > 1 + tolerance else ''))
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks sudoku generation and solving')
+    parser.add_argument('--engine', default=sudokuGenerator.defaultEngine, choices=['bitmask', 'cell'])
+    parser.add_argument('-r', '--runs', type=int, default=20, help='timed runs of every case')
+    parser.add_argument('-s', '--seed', type=int, default=2017)
+    parser.add_argument('-c', '--cases', nargs='+', help='only run cases starting with these names, e.g. main solve:')
+    parser.add_argument('-o', '--output', help='file to write the JSON results to (default: stdout)')
+    parser.add_argument('-b', '--baseline', help='earlier JSON results to compare against')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2, help='allowed slowdown before failing')
+    args = parser.parse_args(argv)
+
+    results = runAll(args.engine, args.runs, args.seed, args.cases)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            if compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,157 @@
+# Board state - incremental sudoku board with O(1) move checks, undo, win detection, candidates and hints
+
+import math
+
+class boardState(object):
+    """ Keeps a board (a list of rows, 0 for an empty square) together with one occupancy bitset per row, column
+        and block, a count of filled squares and a mask of the given squares. Every move updates these in place,
+        so checking a move, making it, undoing it and detecting a win never rescan the board. version goes up on
+        every change, so anything drawn from the board can be cached until it changes"""
+    def __init__(self, board):
+        self.n = len(board)
+        self.N = int(math.sqrt(self.n))
+        self.board = [list(row) for row in board]
+        self.givens = [[value != 0 for value in row] for row in board]
+        self.history = []
+        self.rows = [0] * self.n
+        self.cols = [0] * self.n
+        self.blocks = [0] * self.n
+        self.filled = 0
+        self.version = 0
+        self.full = (1 << (self.n + 1)) - 2
+        for r in range(self.n):
+            for c in range(self.n):
+                if self.board[r][c]:
+                    self.add(r, c, self.board[r][c])
+
+    def block(self, r, c):
+        return (r // self.N) * self.N + c // self.N
+
+    def add(self, r, c, num):
+        bit = 1 << num
+        self.rows[r] |= bit
+        self.cols[c] |= bit
+        self.blocks[self.block(r, c)] |= bit
+        self.filled += 1
+
+    def remove(self, r, c, num):
+        bit = ~(1 << num)
+        self.rows[r] &= bit
+        self.cols[c] &= bit
+        self.blocks[self.block(r, c)] &= bit
+        self.filled -= 1
+
+    def is_given(self, r, c):
+        """ Returns True if the square was filled in on the original board"""
+        return self.givens[r][c]
+
+    def can_place(self, r, c, num):
+        """ Returns True if num can be written in square (r, c). 0 clears the square. Given squares can't change"""
+        if self.givens[r][c] or num < 0 or num > self.n:
+            return False
+        if num == 0 or num == self.board[r][c]:
+            return True
+        return not (self.rows[r] | self.cols[c] | self.blocks[self.block(r, c)]) & (1 << num)
+
+    def place(self, r, c, num):
+        """ Writes num in square (r, c) if it is legal. Returns whether the move was made"""
+        if not self.can_place(r, c, num):
+            return False
+        old = self.board[r][c]
+        self.history.append((r, c, old))
+        self.set(r, c, old, num)
+        return True
+
+    def set(self, r, c, old, num):
+        if old:
+            self.remove(r, c, old)
+        if num:
+            self.add(r, c, num)
+        self.board[r][c] = num
+        self.version += 1
+
+    def undo(self):
+        """ Takes back the last move. Returns False if there is nothing to undo"""
+        if not self.history:
+            return False
+        r, c, old = self.history.pop()
+        self.set(r, c, self.board[r][c], old)
+        return True
+
+    def reset(self):
+        """ Takes back every move, leaving only the given squares"""
+        while self.undo():
+            pass
+
+    def is_complete(self):
+        """ Returns True if every square is filled. Moves are only made when legal, so a full board is a win"""
+        return self.filled == self.n * self.n
+
+    def candidates(self, r, c):
+        """ Returns the numbers that can still go in square (r, c) as a bitmask (bit num set for each), or 0 if the
+            square is filled. This only reads the row, column and block bitsets, so it is always up to date"""
+        if self.board[r][c]:
+            return 0
+        return self.full & ~(self.rows[r] | self.cols[c] | self.blocks[self.block(r, c)])
+
+    def units(self):
+        """ Yields (kind, index, squares) for every row, column and block"""
+        for i in range(self.n):
+            yield 0, i, [(i, c) for c in range(self.n)]
+        for i in range(self.n):
+            yield 1, i, [(r, i) for r in range(self.n)]
+        for i in range(self.n):
+            r0, c0 = (i // self.N) * self.N, (i % self.N) * self.N
+            yield 2, i, [(r0 + r, c0 + c) for r in range(self.N) for c in range(self.N)]
+
+    def hint(self, names=('row', 'column')):
+        """ Finds the next logically forced move. Returns (r, c, num, reason) or None if the board needs a guess.
+            Naked singles are tried first, then hidden singles. If neither is found, pointing pairs (a number
+            that can only go in one row or column of a block) are used to remove candidates and the search is
+            repeated. names are the words used for the first and second index in the reason"""
+        cand = {}
+        for r in range(self.n):
+            for c in range(self.n):
+                if not self.board[r][c]:
+                    cand[(r, c)] = self.candidates(r, c)
+        kinds = list(names) + ['block']
+        steps = []
+        while True:
+            for (r, c), mask in cand.items():
+                if mask and not mask & (mask - 1):
+                    num = mask.bit_length() - 1
+                    return r, c, num, ' '.join(steps + ['Only %d fits in %s %d, %s %d' %
+                                                        (num, names[0], r + 1, names[1], c + 1)])
+            units = list(self.units())
+            for kind, i, squares in units:
+                for num in range(1, self.n + 1):
+                    places = [sq for sq in squares if cand.get(sq, 0) & (1 << num)]
+                    if len(places) == 1:
+                        r, c = places[0]
+                        return r, c, num, ' '.join(steps + ['%d can only go in one square of %s %d' %
+                                                            (num, kinds[kind], i + 1)])
+            removed = False
+            for kind, b, squares in units[2 * self.n:]:
+                for num in range(1, self.n + 1):
+                    bit = 1 << num
+                    places = [sq for sq in squares if cand.get(sq, 0) & bit]
+                    if len(places) < 2:
+                        continue
+                    for line in (0, 1):
+                        if len(set(sq[line] for sq in places)) != 1:
+                            continue
+                        i = places[0][line]
+                        for sq in cand:
+                            if sq[line] == i and self.block(sq[0], sq[1]) != b and cand[sq] & bit:
+                                cand[sq] &= ~bit
+                                removed = True
+                        if removed:
+                            steps.append('Block %d has %d only in %s %d, so it is removed from the rest of that %s.' %
+                                         (b + 1, num, names[line], i + 1, names[line]))
+                            break
+                    if removed:
+                        break
+                if removed:
+                    break
+            if not removed:
+                return None
@@ -0,0 +1,77 @@
+# Frame grabber - reads the camera on its own thread so the game never waits on camera I/O
+
+import collections
+import threading
+import time
+
+class frameGrabber(object):
+    """ Reads frames from a cv2.VideoCapture on a background thread into a ring buffer holding the newest size
+        frames, so frames never pile up in the driver. latest() hands out the newest frame and skips the older
+        ones, which are counted as dropped. Pass the capture time latest() returns to processed() once the frame
+        has been handled to record capture to processing latency"""
+    def __init__(self, cap, size=2, window=120):
+        self.cap = cap
+        self.frames = collections.deque(maxlen=size)                            # (sequence number, capture time, frame)
+        self.newFrame = threading.Condition()
+        self.captured = 0
+        self.last = 0                                                     # Sequence number of the last frame handed out
+        self.dropped = 0
+        self.failures = 0                                                                 # Reads that returned no frame
+        self.latencies = collections.deque(maxlen=window)               # Seconds from capture to processed, most recent
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """ Starts the capture thread. Returns the grabber so it can be made and started in one line"""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self.work, name='frameGrabber', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """ Stops the capture thread after its current read"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def work(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.failures += 1
+                time.sleep(.01)
+                continue
+            stamp = time.perf_counter()
+            with self.newFrame:
+                self.captured += 1
+                self.frames.append((self.captured, stamp, frame))
+                self.newFrame.notify_all()
+
+    def latest(self, timeout=None):
+        """ Waits for a frame newer than the last one handed out and returns (frame, capture time), or None if
+            timeout seconds pass first. Frames captured in between are skipped"""
+        with self.newFrame:
+            if not self.newFrame.wait_for(lambda: self.frames and self.frames[-1][0] > self.last, timeout):
+                return None
+            number, stamp, frame = self.frames[-1]
+            self.dropped += number - self.last - 1
+            self.last = number
+        return frame, stamp
+
+    def processed(self, stamp):
+        """ Records that the frame captured at stamp has been fully processed"""
+        self.latencies.append(time.perf_counter() - stamp)
+
+    def stats(self):
+        """ Returns a dict of frames captured, dropped and failed reads, and the mean and worst latency in ms
+            over the most recent frames"""
+        latencies = list(self.latencies)
+        return {
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'failures': self.failures,
+            'latency': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            'worstLatency': 1000 * max(latencies) if latencies else 0.0
+        }
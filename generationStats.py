@@ -0,0 +1,87 @@
+# Generation stats - counts and times the work done by the sudoku generators and solvers
+
+# Usage: python generationStats.py Hard [--engine cell] [--count 10] [--profile hard.prof]
+# Prints how many guesses, propagation passes, backtracks, restarts, deep copies and checker calls the puzzles took
+# and how long each phase ran. With --profile the generation also runs under cProfile, the statistics are written
+# to the given file (open them with pstats or snakeviz) and the slowest functions are printed.
+# Phase times are inclusive: the time in 'solver' also contains the 'deepcopy' and 'sudokuChecker' it called.
+
+import argparse
+import cProfile
+import pstats
+import sys
+import time
+import sudokuGenerator
+import sudokuSolver
+
+class generationStats(object):
+    """ Collects counts and phase times from sudokuGenerator and sudokuSolver while it is used in a with block.
+        counts holds the number of each event, calls and times the number of calls and total seconds of each
+        phase. If callback is given it is called as callback(name, value) for every event and timing as it
+        happens, e.g. to stream them to a log"""
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.counts = {}
+        self.calls = {}
+        self.times = {}
+
+    def add(self, key, n=1):
+        self.counts[key] = self.counts.get(key, 0) + n
+        if self.callback is not None:
+            self.callback(key, n)
+
+    def time(self, phase, seconds):
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.times[phase] = self.times.get(phase, 0.0) + seconds
+        if self.callback is not None:
+            self.callback(phase, seconds)
+
+    def __enter__(self):
+        self.previous = sudokuGenerator.counters, sudokuSolver.counters
+        sudokuGenerator.counters = self
+        sudokuSolver.counters = self
+        return self
+
+    def __exit__(self, *exc):
+        sudokuGenerator.counters, sudokuSolver.counters = self.previous
+
+    def report(self):
+        """ Returns the counts and phase times as lines of text, slowest phase first"""
+        lines = ['%-16s %10d' % (key, self.counts[key]) for key in sorted(self.counts)]
+        for phase in sorted(self.times, key=self.times.get, reverse=True):
+            lines.append('%-16s %10d calls %10.4f s' % (phase, self.calls[phase], self.times[phase]))
+        return '\n'.join(lines)
+
+def generate(level, engine=None, count=1, profile=None, callback=None):
+    """ Generates count puzzles of level with sudokuGenerator.main while collecting stats. If profile is a path,
+        the generation also runs under cProfile and the profile is written there. Returns the generationStats"""
+    profiler = cProfile.Profile() if profile else None
+    with generationStats(callback) as stats:
+        t1 = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        for n in range(count):
+            sudokuGenerator.main(level, engine, verbose = False)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+        stats.time('total', time.perf_counter() - t1)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Counts and times the work done generating sudoku puzzles')
+    parser.add_argument('level', choices=sudokuGenerator.LEVELS)
+    parser.add_argument('--engine', default=sudokuGenerator.defaultEngine, choices=['bitmask', 'cell'])
+    parser.add_argument('-n', '--count', type=int, default=1, help='number of puzzles to generate')
+    parser.add_argument('-p', '--profile', help='run under cProfile and write the profile to this file')
+    args = parser.parse_args(argv)
+
+    # The cell solver recurses once per restart, and profiling adds to the depth
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    stats = generate(args.level, args.engine, args.count, args.profile)
+    print(stats.report())
+    if args.profile:
+        pstats.Stats(args.profile).sort_stats('cumulative').print_stats(20)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
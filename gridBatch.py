@@ -0,0 +1,101 @@
+# Grid batch - fills many random completed sudoku grids at once with NumPy
+
+# Usage: python gridBatch.py -n 100000 [--batch 4096] [--seed 1]
+# A batch is a (B, 81) array of digits and a (B, 81) array of candidate masks (bit d-1 set means digit d is still
+# possible, as in sudokuSolver.py). Every step fills one square of every grid in the batch: the empty square with
+# the fewest candidates (ties broken at random), with a random one of its candidates, which is then removed from the
+# square's peers. A square with one candidate always goes first, so naked singles are propagated on the way. A grid
+# that leaves a square with no candidates is wiped and started again on its own, without holding up the others.
+
+import argparse
+import sys
+import time
+import numpy as np
+import sudokuSolver
+
+tables = {}
+
+def tablesOf(k):
+    """ Returns the (cached) peer table and the popcount and n-th set bit lookup tables for boxes of k by k. Filled
+        squares are marked with the extra bit 1 << n, which has a popcount larger than any empty square"""
+    if k not in tables:
+        geo = sudokuSolver.geometryOf(k)
+        if geo.n > 16:
+            raise ValueError('grids larger than 16x16 are not supported')
+        masks = np.arange(1 << geo.n)
+        bits = (masks[:, None] >> np.arange(geo.n)) & 1
+        popcount = np.full(2 << geo.n, geo.n + 1, dtype=np.int32)
+        popcount[masks] = bits.sum(axis=1)
+        # nth[m, r] is the digit of the r-th candidate in mask m
+        nth = np.zeros((1 << geo.n, geo.n), dtype=np.uint8)
+        ranks = np.cumsum(bits, axis=1) - 1
+        m, d = np.nonzero(bits)
+        nth[m, ranks[m, d]] = d + 1
+        tables[k] = np.array(geo.peers), popcount, nth, geo
+    return tables[k]
+
+def randomGrids(count, rng=None, k=3):
+    """ Returns count random completed grids with k by k boxes as a (count, n*n) array of uint8. rng is a
+        numpy.random.Generator or a seed"""
+    rng = np.random.default_rng(rng)
+    peers, popcount, nth, geo = tablesOf(k)
+    size = geo.size
+    filledMark = 1 << geo.n
+    grids = np.zeros((count, size), dtype=np.uint8)
+    # Working set: the grids still being filled, and which grid each one is
+    which = np.arange(count)
+    g = np.zeros((count, size), dtype=np.uint8)
+    c = np.full((count, size), geo.all, dtype=np.int32)
+    filled = np.zeros(count, dtype=np.int32)
+    # Ties between squares with as few candidates are broken by a random order that is fixed for each grid
+    noise = rng.permutation(np.tile(np.arange(size, dtype=np.int32), (count, 1)), axis=1)
+    while len(which):
+        rows = np.arange(len(which))
+        square = (popcount[c] * size + noise).argmin(axis=1)
+        mask = c[rows, square]
+        digit = nth[mask, rng.integers(0, 1 << 30, size=len(rows)) % popcount[mask]]
+        g[rows, square] = digit
+        c[rows, square] = filledMark
+        bit = 1 << (digit.astype(np.int32) - 1)
+        around = peers[square]
+        left = c[rows[:, None], around] & ~bit[:, None]
+        c[rows[:, None], around] = left
+        filled += 1
+        # A grid whose peers ran out of candidates is started again
+        stalled = (left == 0).any(axis=1)
+        if stalled.any():
+            g[stalled] = 0
+            c[stalled] = geo.all
+            filled[stalled] = 0
+        done = filled == size
+        if done.any():
+            grids[which[done]] = g[done]
+            keep = ~done
+            which, g, c, filled, noise = which[keep], g[keep], c[keep], filled[keep], noise[keep]
+    return grids
+
+def gridStream(batch=1024, rng=None, k=3):
+    """ Yields random completed grids one at a time as flat lists of ints, filling them batch at a time"""
+    rng = np.random.default_rng(rng)
+    while True:
+        for grid in randomGrids(batch, rng, k).tolist():
+            yield grid
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times filling random completed sudoku grids in batches')
+    parser.add_argument('-n', '--count', type=int, default=100000, help='number of grids to fill')
+    parser.add_argument('-b', '--batch', type=int, default=4096, help='grids filled at once')
+    parser.add_argument('-k', type=int, default=3, help='box size (3 for 9x9, 4 for 16x16)')
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    t1 = time.perf_counter()
+    done = 0
+    while done < args.count:
+        done += len(randomGrids(min(args.batch, args.count - done), rng, args.k))
+    elapsed = time.perf_counter() - t1
+    print('%d grids in %.2f s (%.0f grids/s)' % (done, elapsed, done / elapsed))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
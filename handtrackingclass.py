@@ -1,167 +1,262 @@
 # File containing all hand detection algorithms
 
+from frameGrabber import frameGrabber
+
 class handTracking(object):
     import cv2
     import numpy
     import math
 
-    def __init__(self):
+    def __init__(self, threaded=True, faceEvery=10, faceScale=.5, handEvery=10, handMargin=.5, captureSize=(800, 300),
+                 scale=1.0):
         self.cv2 = handTracking.cv2
         self.np = handTracking.numpy
         self.math = handTracking.math
         self.cap = self.cv2.VideoCapture(0)                                                          # Initialize camera
-        self.cap.set(3, 800)                                                                           # Set frame width
-        self.cap.set(4, 300)                                                                          # Set frame height
+        self.cap.set(3, captureSize[0])                                                                # Set frame width
+        self.cap.set(4, captureSize[1])                                                               # Set frame height
         self.cap.set(5, 30)                                                                       # Set video frame rate
+        self.cap.set(self.cv2.CAP_PROP_BUFFERSIZE, 1)                  # Keep as few frames as the driver allows waiting
         self.min_YCrCb = self.np.array([0, 138, 77], self.np.uint8)                      # Minimum skin threshold values
         self.max_YCrCb = self.np.array([255, 183, 127], self.np.uint8)                   # Maximum skin threshold values
 
                                                                         # Initialize Haar cascade for facial recognition
         self.face_cascade = self.cv2.CascadeClassifier('haarcascade_frontalface_default.xml')
+        self.faceEvery = faceEvery                                      # Frames between detections over the whole frame
+        self.faceScale = faceScale                                        # Scale of the image faces are searched for in
+        self.faceFrame = 0                                        # Frames since the last detection over the whole frame
+        self.faces = []                                                         # Last face boxes found, in frame pixels
+        self.handEvery = handEvery                # Frames between hand searches over the whole frame, 1 for every frame
+        self.handMargin = handMargin          # Part of its size a hand's box grows by on each side to be searched again
+        self.handFrame = 0                                      # Frames since the last hand search over the whole frame
+        self.handBoxes = []                                                     # Bounding boxes of the hands last found
+        self.handLost = False                                     # True if fewer hands were found than the frame before
+        self.scale = scale                             # Scale of the copy of the frame hands are segmented and found in
+        self.blur = max(3, int(7 * scale) | 1)                         # Median blur kernel, 7 at full scale, always odd
+        self.erosions = max(1, int(round(2 * scale)))                       # Erosions of the skin mask, 2 at full scale
+        self.threshArea = 5000 * scale * scale                 # Least contour area of a hand, 5000 pixels at full scale
+
+                                               # Reads the camera on its own thread, so loop() never waits on camera I/O
+        self.grabber = frameGrabber(self.cap).start() if threaded else None
 
     def getScreenSize(self):
-        height, width, channels = self.cap.read()[1].shape
+        height, width, channels = handTracking.read(self)[0].shape
         return (width, height)
 
+    def read(self):                                           # Returns the newest camera frame and when it was captured
+        if self.grabber is None:
+            return self.cap.read()[1], None
+        return self.grabber.latest()
+
+    def stats(self):                                          # Returns frame drops and latency, or None if not threaded
+        if self.grabber is None:
+            return None
+        return self.grabber.stats()
+
+    def close(self):                                                           # Stops the capture thread and the camera
+        if self.grabber is not None:
+            self.grabber.stop()
+        self.cap.release()
+
     def loop(self):
         cv2 = self.cv2
 
-        ret, frame = self.cap.read()                                  # Store each frame from the video capture in frame
+        frame, stamp = handTracking.read(self)                            # Newest frame, older ones waiting are dropped
+        self.lastFrame = frame                                  # Unflipped frame, kept for reading printed sudokus from
         width, height, channels = frame.shape                                                 # Find dimensions of frame
         frame = handTracking.cv2.flip(frame, 1)                                                # Flips frame over y axis
 
         ### Face removal ###
         frame, faceRemoved = handTracking.removeFace(self, frame, frame.copy())
 
-        ### Blur ###
-        faceRemoved = cv2.medianBlur(faceRemoved, 7)
-
-        ### Skin Mask ###
-        frameYCrCb = cv2.cvtColor(faceRemoved, cv2.COLOR_BGR2YCR_CB)           # Converts frame from BGR to YCrCb format
-                                               # Creates mask for only objects within the bounds of skin color set above
-        skinRegion = cv2.inRange(frameYCrCb, self.min_YCrCb, self.max_YCrCb)
-
-                                                                         # Performs Otsu thresholding on the skin region
-        ret1, thresh = cv2.threshold(skinRegion, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        ### Processing scale ###
+        if self.scale != 1:                                              # Hands are found in a scaled copy of the frame
+            faceRemoved = cv2.resize(faceRemoved, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
 
-        ### Erosion and Dilation ###
-        erode1 = cv2.erode(thresh, None, iterations=2)
-        dilate1 = cv2.dilate(erode1, None, iterations=1)
+        ### Hand regions ###
+        regions = handTracking.handRegions(self, faceRemoved.shape)     # The whole frame, or only around the last hands
+        erode1 = self.np.zeros(faceRemoved.shape[:2], self.np.uint8)
+        contours = []
+        for (x0, y0, x1, y1) in regions:
+            erode1[y0:y1, x0:x1], dilate1 = handTracking.segment(self, faceRemoved[y0:y1, x0:x1])
 
-        ### Contours ###
-        contours = cv2.findContours(dilate1, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)[1]
+            ### Contours ###
+            contours += cv2.findContours(dilate1, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))[-2]
         contours.sort(key=cv2.contourArea, reverse=True)
 
-        threshArea = 5000                                                  # Sets minimum threshold for the contour area
+        threshArea = self.threshArea                                       # Sets minimum threshold for the contour area
         filteredContours = []
-        for i in range(len(contours)):                                  # Only contours with an area above 5000 are kept
+        for i in range(len(contours)):                            # Only contours with an area above threshArea are kept
             area = cv2.contourArea(contours[i])
             if area >= threshArea:
                 filteredContours.append(contours[i])
 
+                                                    # The next frame is only searched around the hands found in this one
+        hands = [cv2.boundingRect(cnt) for cnt in filteredContours[:2]]
+        self.handLost = len(hands) < len(self.handBoxes)
+        self.handBoxes = hands
+        if self.scale != 1:                                           # Hands are tracked and drawn in frame coordinates
+            filteredContours = [(cnt / self.scale).astype(self.np.int32) for cnt in filteredContours]
+
         countList = []
         handList = []
         total = 0
 
-        ### Two hands ###
-        if len(filteredContours) >= 2:                              # Finds contours and number of fingers for each hand
-            cnt1 = filteredContours[0]
-            cnt2 = filteredContours[1]
-            count1, hand1 = handTracking.trackHand(self, cnt1, frame, (50, 100), width)
-            count2, hand2 = handTracking.trackHand(self, cnt2, frame, (50, 150), width)
-            countList += [count1, count2]
-            handList += [hand1, hand2]
-            total = sum(countList)                                                             # Total number of fingers
-
-        ### One hand ###
-        elif len(filteredContours) >= 1:
-            cnt1 = filteredContours[0]
-            count1, hand1 = handTracking.trackHand(self, cnt1, frame, (50, 100), width)
-            countList.append(count1)
-            handList.append(hand1)
-            total = sum(countList)
+        ### Hands ###
+                                                             # Finds number of fingers for the two largest hands at once
+        results = handTracking.trackHands(self, filteredContours[:2], frame, width)
+        countList += [count for count, hand in results]
+        handList += [hand for count, hand in results]
+        total = sum(countList)                                                                 # Total number of fingers
 
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) # Converts frame from BGR to RGB format in preparation for Pygame
 
         cv2.imshow("thresh", erode1)
+        if self.grabber is not None:
+            self.grabber.processed(stamp)                                        # Records capture to processing latency
         return frame, erode1, total, handList
 
+    def segment(self, image):                                      # Finds the skin in a BGR image with the face removed
+        cv2 = self.cv2
+
+        ### Blur ###
+        image = cv2.medianBlur(image, self.blur)
+
+        ### Skin Mask ###
+        frameYCrCb = cv2.cvtColor(image, cv2.COLOR_BGR2YCR_CB)                 # Converts frame from BGR to YCrCb format
+                                               # Creates mask for only objects within the bounds of skin color set above
+        skinRegion = cv2.inRange(frameYCrCb, self.min_YCrCb, self.max_YCrCb)
+
+                                                                         # Performs Otsu thresholding on the skin region
+        ret1, thresh = cv2.threshold(skinRegion, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        ### Erosion and Dilation ###
+        erode1 = cv2.erode(thresh, None, iterations=self.erosions)
+        dilate1 = cv2.dilate(erode1, None, iterations=1)
+        return erode1, dilate1
+
+                               # Returns the regions of the frame to search for hands in, as (x0, y0, x1, y1) rectangles
+    def handRegions(self, shape):
+        height, width = shape[:2]
+        full = self.handLost or not self.handBoxes or self.handFrame % self.handEvery == 0
+        self.handFrame += 1
+        if full:                        # Every handEvery frames, when no hand was found or when one was lost last frame
+            return [(0, 0, width, height)]
+        regions = []
+        for (x, y, w, h) in self.handBoxes:                          # Each box grown by handMargin of its size each way
+            dx, dy = int(w * self.handMargin), int(h * self.handMargin)
+            region = (max(x - dx, 0), max(y - dy, 0), min(x + w + dx, width), min(y + h + dy, height))
+            for other in regions[:]:                         # Overlapping regions are merged, so no hand is found twice
+                if region[0] < other[2] and other[0] < region[2] and region[1] < other[3] and other[1] < region[3]:
+                    regions.remove(other)
+                    region = (min(region[0], other[0]), min(region[1], other[1]), max(region[2], other[2]),
+                              max(region[3], other[3]))
+            regions.append(region)
+        return regions
+
     def removeFace(self, original, copy):                                              # Removes the face from the frame
         cv2 = self.cv2
 
         gray = cv2.cvtColor(original, cv2.COLOR_BGR2GRAY)                                         # Convert to grayscale
-        faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)                                            # Find faces
-        for (x, y, w, h) in faces:
+        if self.faceFrame % self.faceEvery == 0:                        # Every faceEvery frames, search the whole frame
+            self.faces = handTracking.findFaces(self, gray, 0, 0)
+        else:                                               # Otherwise only search around each face box found last time
+            faces = []
+            for (x, y, w, h) in self.faces:
+                x0, y0 = max(x - w//2, 0), max(y - h//2, 0)
+                found = handTracking.findFaces(self, gray[y0:y + h + h//2, x0:x + w + w//2], x0, y0, w)
+                faces += found if len(found) else [(x, y, w, h)]                  # A face not found again keeps its box
+            self.faces = faces
+        self.faceFrame += 1
+        for (x, y, w, h) in self.faces:
                                                                      # Draw black rectangle over face in grayscale image
             cv2.rectangle(copy, (x, y), (x + w, int(y + 1.2*h)), (0, 0, 0), -1)
 
         return original, copy
 
+                                           # Finds faces in gray, the part of the frame with its top left at (left, top)
+    def findFaces(self, gray, left, top, width=None):
+        cv2 = self.cv2
+        scale = self.faceScale
+        if scale != 1:                                                         # The cascade runs on a scaled down image
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if width is None:
+            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)                                        # Find faces
+        else:                                          # Around a known face only faces of about its size are looked for
+            faces = self.face_cascade.detectMultiScale(gray, 1.1, 3, minSize=(int(.7*width*scale),)*2,
+                                                       maxSize=(int(1.4*width*scale),)*2)
+                                                                                                 # Boxes in frame pixels
+        return [(int(x/scale) + left, int(y/scale) + top, int(w/scale), int(h/scale)) for (x, y, w, h) in faces]
+
     def trackHand(self, cnt, frame, textPos, width):                        # Tracks hand position and number of fingers
+        return handTracking.trackHands(self, [cnt], frame, width)[0]
+
+                                # Tracks the position and number of fingers of every hand in cnts at once, and returns a
+    def trackHands(self, cnts, frame, width):                            # (count, (side, (cx, cy))) tuple for each hand
         cv2 = self.cv2
-        math = self.math
+        np = self.np
 
-        count = 0
-        side = 0
-        moments = cv2.moments(cnt)
+        hands = []
+        spread = []                                                          # Hands that are not fists and have defects
+        rows = []                                     # Convexity defects of those hands, with the hand, side and height
+        for i, cnt in enumerate(cnts):
+            side = 0
+            moments = cv2.moments(cnt)
                                                                                      # Finds center coordinates for hand
-        cx = int(moments['m10'] / moments['m00'])
-        cy = int(moments['m01'] / moments['m00'])
-        hull = cv2.convexHull(cnt, returnPoints = False)          # Finds convex hull of the hand contour (only indices)
-        pointsHull = cv2.convexHull(cnt, returnPoints = True)    # Finds convex hull of the hand contour (actual points)
+            cx = int(moments['m10'] / moments['m00'])
+            cy = int(moments['m01'] / moments['m00'])
+            hull = cv2.convexHull(cnt, returnPoints = False)      # Finds convex hull of the hand contour (only indices)
+                                                                 # Finds convex hull of the hand contour (actual points)
+            pointsHull = cv2.convexHull(cnt, returnPoints = True)
 
                                                 # Finds shortest distance from the center of the hand to the convex hull
-        radius = int(1.2*cv2.pointPolygonTest(pointsHull, (cx, cy), True))
+            radius = int(1.2*cv2.pointPolygonTest(pointsHull, (cx, cy), True))
                                                       # Draws largest circle inside the convex hull centered at (cx, cy)
-        cv2.circle(frame, (cx, cy), radius, (255, 255, 255), 2)
+            cv2.circle(frame, (cx, cy), radius, (255, 255, 255), 2)
 
-        x, y, w, h = cv2.boundingRect(cnt)                                        # Draws bounding rectangle around hand
-        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            x, y, w, h = cv2.boundingRect(cnt)                                    # Draws bounding rectangle around hand
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
                                                         # Finds convexity defects along contour based on its convex hull
-        defects = cv2.convexityDefects(cnt, hull)
-
-        if cx < width/2:                                          # Center of the hand is on the left side of the screen
-            side = 0
-        elif cx > width/2:                                       # Center of the hand is on the right side of the screen
-            side = 1
+            defects = cv2.convexityDefects(cnt, hull)
 
-        try:
-            for i in range(defects.shape[0]):                                          # For all convexity defects found
-                s, e, f, d = defects[i, 0]
+            if cx < width/2:                                      # Center of the hand is on the left side of the screen
+                side = 0
+            elif cx > width/2:                                   # Center of the hand is on the right side of the screen
+                side = 1
+            hands.append((side, (cx, cy)))
 
-                start = tuple(cnt[s][0])
-                end = tuple(cnt[e][0])
-                far = tuple(cnt[f][0])
+            if defects is None:
+                print("No defects found")
+                            # If the height of the bounding rectangle is smaller than the diameter of the center circle,
+                                                      # then the hand must be in a fist, and therefore no fingers are up
+            elif h > 2.4*radius:
+                spread.append(i)
+                s, e, f = defects[:, 0, 0], defects[:, 0, 1], defects[:, 0, 2]
+                n = len(s)
+                rows.append((np.full(n, i), cnt[s, 0], cnt[e, 0], cnt[f, 0], np.full(n, side), np.full(n, h)))
+
+        fingers = np.zeros(len(cnts), np.int64)
+        if rows:                                                         # All defects of all hands are measured at once
+            hand, start, end, far, side, h = [np.concatenate(column) for column in zip(*rows)]
                        # Find length of sides of triangle between two nearest points on convex hull and convexity defect
-                a = math.sqrt((end[0] - start[0]) ** 2 + (end[1] - start[1]) ** 2)
-                b = math.sqrt((far[0] - start[0]) ** 2 + (far[1] - start[1]) ** 2)
-                c = math.sqrt((end[0] - far[0]) ** 2 + (end[1] - far[1]) ** 2)
+            a = np.sqrt(((end - start).astype(np.float64) ** 2).sum(axis=1))
+            b = np.sqrt(((far - start).astype(np.float64) ** 2).sum(axis=1))
+            c = np.sqrt(((end - far).astype(np.float64) ** 2).sum(axis=1))
 
                                                       # Use Law of Cosines to find angle of triangle at convexity defect
-                angle = math.acos((b ** 2 + c ** 2 - a ** 2) / (2 * b * c)) * 57
+            with np.errstate(divide='ignore', invalid='ignore'):
+                angle = np.arccos(np.clip((b ** 2 + c ** 2 - a ** 2) / (2 * b * c), -1, 1)) * 57
 
                                          # Determines end points to draw lines that most closely approximate the fingers
-                if side:              # If the hand is on the right side, use the closest right point on the convex hull
-                    fingerLen = b
-                    defectPoint = start
-                else:                   # If the hand is on the left side, use the closest left point on the convex hull
-                    fingerLen = c
-                    defectPoint = end
-
-                            # If the height of the bounding rectangle is smaller than the diameter of the center circle,
-                                                      # then the hand must be in a fist, and therefore no fingers are up
-                if h > 2.4*radius:
-                    if fingerLen >= h/4 and angle < 90:
-                        count += 1
-                        # cv2.circle(frame, far, 1, [0, 0, 255], 6)
-                        # cv2.circle(frame, end, 1, [0, 0, 255], 12)
-                        cv2.line(frame, defectPoint, far, [255, 0, 0], 2)         # Draws lines that approximate fingers
-                else:
-                    return (0, (side, (cx, cy)))                         # No fingers are up, then the hand is in a fist
-
-                cv2.line(frame, start, end, [0, 255, 0], 2)                                              #Draws contours
-            return (count + 1, (side, (cx, cy)))
-
-        except(AttributeError):
-            print("No defects found")
-            return (0, (side, (cx, cy)))
+                                     # If the hand is on the right side, use the closest right point on the convex hull,
+            right = side == 1                                  # otherwise use the closest left point on the convex hull
+            fingerLen = np.where(right, b, c)
+            defectPoint = np.where(right[:, None], start, end)
+            finger = (fingerLen >= h/4) & (angle < 90)
+            fingers = np.bincount(hand[finger], minlength=len(cnts))
+
+            cv2.polylines(frame, list(np.stack((start, end), axis=1)), False, [0, 255, 0], 2)            #Draws contours
+                                                                                  # Draws lines that approximate fingers
+            cv2.polylines(frame, list(np.stack((defectPoint, far), axis=1)[finger]), False, [255, 0, 0], 2)
+
+        return [(int(fingers[i]) + 1 if i in spread else 0, hands[i]) for i in range(len(cnts))]
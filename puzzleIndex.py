@@ -0,0 +1,147 @@
+# Puzzle index - canonical forms of 9x9 puzzles and a hash index that finds equivalent puzzles
+
+# Two puzzles are equivalent if one can be turned into the other by relabelling the digits, reordering rows within
+# bands, bands, columns within stacks and stacks, and transposing (see puzzleSymmetry.py). The canonical form of a
+# puzzle is the smallest of all its equivalent puzzles, read as 81 digits in row major order with 0 for an empty
+# square and digits numbered in order of first appearance. Equivalent puzzles have the same canonical form.
+# All 2 * 1296 column arrangements are kept in one NumPy array, and the rows are then chosen one at a time, keeping
+# only the arrangements that tie for the smallest row so far, so most of the 3.4 million transforms are never built.
+# Ties that reach the same state by different row orders are merged, which keeps sparse and symmetric grids (an
+# empty grid ties at every step) as quick as full ones.
+
+import hashlib
+import itertools
+import numpy as np
+
+def lineOrders():
+    """ Returns every order of 9 lines that keeps the bands of 3 together, as a (1296, 9) array"""
+    orders = []
+    for bands in itertools.permutations(range(3)):
+        for a, b, c in itertools.product(itertools.permutations(range(3)), repeat=3):
+            orders.append([bands[0] * 3 + i for i in a] + [bands[1] * 3 + i for i in b] + [bands[2] * 3 + i for i in c])
+    return np.array(orders)
+
+ORDERS = lineOrders()
+PLACES = 10 ** np.arange(8, -1, -1, dtype=np.int64)                  # Turns a row of 9 digits into one comparable int
+BITS = 2 ** np.arange(8, -1, -1, dtype=np.int64)                     # Turns a row of 9 flags into one comparable int
+LABEL_SHIFTS = 4 * np.arange(9, dtype=np.int64)                          # Packs the labels of digits 1 to 9 into an int
+
+def firstRowOrders():
+    """ The digits of the first row are all new, so they are labelled 1, 2, 3... from left to right whatever they
+        are, and the smallest first rows are simply the ones with their empty squares furthest left. Returns the
+        smallest pattern of empty squares each of the 512 patterns can be put in, and the column orders that do it"""
+    flags = (np.arange(512)[:, None] >> np.arange(8, -1, -1)) & 1
+    patterns = flags[:, ORDERS] @ BITS
+    smallest = patterns.min(axis=1)
+    return smallest, [np.nonzero(patterns[m] == smallest[m])[0] for m in range(512)]
+
+SMALLEST, FIRST_ORDERS = firstRowOrders()
+
+def label(values, labels, nextLabel):
+    """ Relabels rows of digits in the order they first appear, carrying on from the labels each row already has.
+        Updates labels and returns the relabelled rows and the next unused label of each"""
+    everyone = np.arange(len(values))
+    out = np.empty_like(values)
+    for c in range(9):
+        d = values[:, c]
+        new = labels[everyone, d] < 0
+        labels[everyone[new], d[new]] = nextLabel[new]
+        nextLabel = nextLabel + new
+        out[:, c] = labels[everyone, d]
+    return out, nextLabel
+
+def canonical(grid):
+    """ Returns the canonical form of a flat 9x9 grid (puzzle or solution) as a string of 81 digits"""
+    if len(grid) != 81:
+        raise ValueError('canonical forms are only defined for 9x9 grids')
+    g = np.asarray(grid, dtype=np.int64).reshape(9, 9)
+    grids = np.stack((g, g.T))
+    # Only the column orders that give the smallest first row are ever built
+    masks = SMALLEST[(grids > 0) @ BITS]
+    best = masks.min()
+    flips, rows, orders = [], [], []
+    for t, r in zip(*np.nonzero(masks == best)):
+        found = FIRST_ORDERS[(grids[t, r] > 0) @ BITS]
+        flips.append(np.full(len(found), t))
+        rows.append(np.full(len(found), r))
+        orders.append(found)
+    row = np.concatenate(rows)
+    # variants[v] is the grid (transposed if v >= 1296) with its columns in order v % 1296
+    built, variant = np.unique(np.concatenate(flips) * len(ORDERS) + np.concatenate(orders), return_inverse=True)
+    variants = grids[(built // len(ORDERS))[:, None, None], np.arange(9)[None, :, None],
+                     ORDERS[built % len(ORDERS)][:, None, :]]
+    state = np.arange(len(variant))
+    used = np.zeros(len(state), dtype=np.int64)                                 # Bitmask of the rows already placed
+    labels = np.full((len(state), 10), -1, dtype=np.int64)             # New label of each digit, -1 until it is seen
+    labels[:, 0] = 0
+    nextLabel = np.ones(len(state), dtype=np.int64)
+    lines = np.arange(9)
+    result = []
+    for step in range(9):
+        if step > 0:
+            taken = (used[:, None] >> lines) & 1
+            if step % 3 == 0:                                    # A new band starts: any row of an unused band
+                allowed = ~np.repeat(taken.reshape(-1, 3, 3).any(axis=2), 3, axis=1)
+            else:                                                          # Otherwise an unused row of the same band
+                allowed = (lines // 3 == band[:, None]) & (taken == 0)
+            state, row = np.nonzero(allowed)
+        lab = labels[state]
+        out, nl = label(variants[variant[state], row], lab, nextLabel[state])
+        keys = out @ PLACES
+        best = keys.min()
+        keep = keys == best
+        result.append('%09d' % best)
+        variant = variant[state[keep]]
+        used = used[state[keep]] | (1 << row[keep])
+        band = row[keep] // 3
+        labels = lab[keep]
+        nextLabel = nl[keep]
+        # Ties reached by different row orders that end in the same variant, rows and labels have the same future,
+        # so one of each is kept. Without this an empty grid ties everywhere and the ties multiply at every step
+        _, first = np.unique((variant << 45) | (used << 36) | ((labels[:, 1:] + 1) << LABEL_SHIFTS).sum(axis=1),
+                             return_index=True)
+        variant, used, band = variant[first], used[first], band[first]
+        labels, nextLabel = labels[first], nextLabel[first]
+    return ''.join(result)
+
+def canonicalKey(grid):
+    """ Returns a 16 byte hash of the canonical form of a grid, small enough to keep for millions of puzzles"""
+    return hashlib.blake2b(canonical(grid).encode(), digest_size=16).digest()
+
+class puzzleIndex(object):
+    """ Set of canonical keys. Finding out whether an equivalent puzzle has been seen is one hash lookup"""
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, grid):
+        return canonicalKey(grid) in self.keys
+
+    def add(self, grid, key=None):
+        """ Adds a grid (or its precomputed canonicalKey). Returns False if an equivalent one was already there"""
+        if key is None:
+            key = canonicalKey(grid)
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    def unique(self, grids):
+        """ Yields the grids of an iterable that are not equivalent to any seen before, adding them as it goes"""
+        for grid in grids:
+            if self.add(grid):
+                yield grid
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            for key in self.keys:
+                f.write(key)
+
+    @classmethod
+    def load(cls, path):
+        """ Reads an index written by save"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        return cls(data[i:i + 16] for i in range(0, len(data), 16))
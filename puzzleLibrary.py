@@ -0,0 +1,156 @@
+# Puzzle library - compact on-disk store of rated sudoku puzzles, memory mapped and indexed by difficulty
+
+# File layout (little endian):
+#   header   magic, version, record size, number of levels
+#   index    (first record, record count) for each level in LEVELS
+#   records  puzzle and solution packed two squares per byte, guess count, level
+# Records are grouped by level, so a random puzzle of a level is one random index into its range.
+
+import argparse
+import mmap
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import gridBatch
+import puzzleIndex
+import sudokuGenerator
+import sudokuSolver
+
+MAGIC = b'SUDOKLIB'
+VERSION = 1
+LEVELS = ['Easy', 'Medium', 'Hard', 'Insane']
+HEADER = struct.Struct('<8sHHI')
+INDEX = struct.Struct('<QQ')
+RECORD = struct.Struct('<41s41sHB')
+DATA = HEADER.size + INDEX.size * len(LEVELS)
+
+def pack(grid):
+    """ Packs a flat grid of 81 ints into 41 bytes, two squares per byte"""
+    values = list(grid) + [0]
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, 82, 2))
+
+def unpack(data):
+    """ Unpacks 41 bytes from pack back into a flat grid of 81 ints"""
+    grid = []
+    for b in data:
+        grid.append(b >> 4)
+        grid.append(b & 15)
+    return grid[:81]
+
+def rateGrid(grid):
+    """ Solves and rates a flat grid with sudokuGenerator.solve. Returns the solution grid, guesses and level"""
+    s = sudokuGenerator.solve(sudokuGenerator.cellsFromGrid(grid))
+    return sudokuSolver.gridFromCells(s[0]), s[1], s[2]
+
+def generate(count, levels=None, index=None):
+    """ Yields (puzzle, solution, guesses, level) records. With no levels, count puzzles are dug from fresh grids
+        and kept at whatever level they are rated (the grids are filled in batches with gridBatch). Otherwise
+        count puzzles are made for each of the levels.
+        If index is a puzzleIndex, puzzles equivalent to one already in it are thrown away and made again"""
+    if levels is None:
+        n = 0
+        grids = gridBatch.gridStream(min(count, 1024))
+        while n < count:
+            p = sudokuGenerator.cellsFromGrid(next(grids))
+            solution = sudokuSolver.gridFromCells(p)
+            s = sudokuGenerator.puzzleGen(p)
+            puzzle = sudokuSolver.gridFromCells(s[0])
+            if index is None or index.add(puzzle):
+                n += 1
+                yield puzzle, solution, s[1], s[2]
+    else:
+        for level in levels:
+            n = 0
+            while n < count:
+                puzzle = sudokuSolver.gridFromBoard(sudokuGenerator.main(level, verbose = False))
+                if index is None or index.add(puzzle):
+                    n += 1
+                    yield (puzzle,) + rateGrid(puzzle)
+
+def write(path, records):
+    """ Writes an iterable of (puzzle, solution, guesses, level) records to a library file. Records are spooled
+        to one temporary file per level so memory use does not grow with the number of records"""
+    spools = [tempfile.TemporaryFile() for level in LEVELS]
+    counts = [0] * len(LEVELS)
+    for puzzle, solution, guesses, level in records:
+        n = LEVELS.index(level)
+        spools[n].write(RECORD.pack(pack(puzzle), pack(solution), min(guesses, 0xFFFF), n))
+        counts[n] += 1
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(LEVELS)))
+        first = 0
+        for n in range(len(LEVELS)):
+            f.write(INDEX.pack(first, counts[n]))
+            first += counts[n]
+        for spool in spools:
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+            spool.close()
+    return dict(zip(LEVELS, counts))
+
+class puzzleLibrary(object):
+    """ Read only view of a library file. The file is memory mapped, so opening it only reads the header and
+        index and picking a puzzle only touches its own record"""
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, levels = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or size != RECORD.size:
+            self.close()
+            raise ValueError(path + ' is not a puzzle library')
+        self.index = {}
+        for n in range(levels):
+            self.index[LEVELS[n]] = INDEX.unpack_from(self.map, HEADER.size + n * INDEX.size)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def count(self, level):
+        """ Returns the number of puzzles of a level in the library"""
+        return self.index.get(level, (0, 0))[1]
+
+    def record(self, i):
+        """ Returns record i as (puzzle, solution, guesses, level) with flat grids"""
+        puzzle, solution, guesses, level = RECORD.unpack_from(self.map, DATA + i * RECORD.size)
+        return unpack(puzzle), unpack(solution), guesses, LEVELS[level]
+
+    def random(self, level, rng=random):
+        """ Returns a random record of the given level, or None if the library has none"""
+        first, count = self.index.get(level, (0, 0))
+        if count == 0:
+            return None
+        return self.record(first + rng.randrange(count))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Writes or inspects a sudoku puzzle library')
+    commands = parser.add_subparsers(dest='command')
+    writer = commands.add_parser('write', help='generate puzzles and write them to a library')
+    writer.add_argument('path')
+    writer.add_argument('-n', '--count', type=int, default=1000,
+                        help='number of puzzles (per level if --levels is given)')
+    writer.add_argument('-l', '--levels', nargs='+', choices=LEVELS,
+                        help='generate exactly COUNT puzzles of each of these levels')
+    writer.add_argument('-u', '--unique', action='store_true',
+                        help='leave out puzzles equivalent to one already in the library')
+    info = commands.add_parser('info', help='print the number of puzzles of each level')
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'write':
+        index = puzzleIndex.puzzleIndex() if args.unique else None
+        counts = write(args.path, generate(args.count, args.levels, index))
+    elif args.command == 'info':
+        library = puzzleLibrary(args.path)
+        counts = {level: library.count(level) for level in LEVELS}
+        library.close()
+    else:
+        parser.print_help()
+        return
+    for level in LEVELS:
+        print(level + ': ' + str(counts[level]))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
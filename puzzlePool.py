@@ -0,0 +1,94 @@
+# Puzzle pool - keeps generated sudoku boards ready for each difficulty so the game never waits on the generator
+
+import collections
+import os
+import threading
+import puzzleLibrary
+import puzzleSymmetry
+import sudokuGenerator
+import sudokuSolver
+
+# Served as they are when a queue is empty, so that get() never blocks or solves. One board per difficulty in row
+# major order, each rated at its difficulty.
+FALLBACK = {
+    'Easy': '170300084604000070002000100540608931013504000806031057059043800060805340430016700',
+    'Medium': '640800009000001000000003042068070500007200800000000020714325000320000700009000201',
+    'Hard': '670012900000000600000000210380400000090000000704030006010060004060700521205008000',
+    'Insane': '907086100006200073000900000620100000008004200700520030800603725000040090062000304'
+}
+
+class puzzlePool(object):
+    """ Fills one queue of boards per difficulty on a background thread. The queues are prefilled when the
+        pool starts and topped back up to size whenever one falls below low. If library is the path of a
+        puzzle library file, levels it holds are filled from the library instead of being generated. Library
+        boards are relabelled and shuffled with puzzleSymmetry.deriveLevel on the background thread, so the
+        same stored puzzle looks different every time it is served but still rates at the level asked for,
+        and get() itself never solves anything"""
+    def __init__(self, levels=('Easy', 'Medium', 'Hard'), size=4, low=2, library=None):
+        self.library = None
+        if library is not None and os.path.exists(library):
+            self.library = puzzleLibrary.puzzleLibrary(library)
+        self.levels = list(levels)
+        self.size = size
+        self.low = low
+        self.queues = {level: collections.deque() for level in self.levels}
+        self.wake = threading.Event()
+        self.cancel = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """ Starts the worker thread, which prefills every queue and then waits to be woken for refills"""
+        if self.running:
+            return
+        self.running = True
+        self.cancel.clear()
+        self.thread = threading.Thread(target=self.work, name='puzzlePool', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """ Stops the worker thread, cancelling the puzzle it is generating"""
+        self.running = False
+        self.cancel.set()
+        self.wake.set()
+
+    def work(self):
+        while self.running:
+            level = self.neediest()
+            if level is None:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            if self.library is not None and self.library.count(level):
+                grid = puzzleSymmetry.deriveLevel(self.library.random(level)[0], level)
+                board = sudokuSolver.boardFromGrid(grid)
+            else:
+                board = sudokuGenerator.main(level, verbose = False, cancel = self.cancel)
+            # A board cut short by stop() may not be of the right level
+            if not self.cancel.is_set():
+                self.queues[level].append(board)
+
+    def neediest(self):
+        """ Returns the level with the fewest boards queued, or None if every queue is full"""
+        if not self.levels:
+            return None
+        level = min(self.levels, key=lambda l: len(self.queues[l]))
+        if len(self.queues[level]) >= self.size:
+            return None
+        return level
+
+    def get(self, level):
+        """ Returns a board (a list of 9 rows) of the given level without blocking. If the queue is empty, or
+            the pool keeps no queue for the level, the bundled fallback board is returned instead"""
+        queue = self.queues.get(level)
+        if not queue:
+            board = sudokuSolver.boardFromGrid([int(c) for c in FALLBACK[level]])
+        else:
+            board = queue.popleft()
+        if queue is not None and len(queue) < self.low:
+            self.wake.set()
+        return board
+
+    def ready(self, level):
+        """ Returns the number of boards queued for a level"""
+        return len(self.queues.get(level, ()))
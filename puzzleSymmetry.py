@@ -0,0 +1,65 @@
+# Puzzle symmetry - derives new looking puzzles from a rated one
+
+# A sudoku stays a sudoku with the same single solution under any of these, and needs the same reasoning to solve:
+#   relabelling the digits, reordering the rows within a band and the bands themselves, doing the same to the
+#   columns and stacks, and transposing. Together they make 9! * (3!^4)^2 * 2, over a trillion, variants of a puzzle.
+# A transform is stored as (rows, cols, digits, transpose): new square (r, c) takes old square (rows[r], cols[c]), or
+# (cols[c], rows[r]) if transpose is True, and old value v becomes digits[v].
+# The guess count rating of sudokuSolver.solveGrid is not invariant under these, so variants meant for a given level
+# are re-rated (deriveLevel) rather than assumed to keep the level of the puzzle they came from.
+
+import random
+import sudokuSolver
+
+def lineOrder(rng, k):
+    """ Returns a random order of the n lines of a grid that keeps each band (group of k lines) together"""
+    bands = list(range(k))
+    rng.shuffle(bands)
+    order = []
+    for b in bands:
+        lines = [b * k + i for i in range(k)]
+        rng.shuffle(lines)
+        order += lines
+    return order
+
+def randomTransform(rng=random, k=3):
+    """ Returns a random transform of grids with k by k boxes, picked evenly from all of them"""
+    n = k * k
+    digits = list(range(1, n + 1))
+    rng.shuffle(digits)
+    rows = lineOrder(rng, k)
+    cols = lineOrder(rng, k)
+    transpose = rng.random() < .5
+    if transpose:
+        rows, cols = cols, rows
+    return rows, cols, [0] + digits, transpose
+
+def applyTransform(grid, transform):
+    """ Returns a flat grid with the transform applied. Empty squares stay empty. Takes one step per square"""
+    rows, cols, digits, transpose = transform
+    n = len(rows)
+    if transpose:
+        return [digits[grid[cols[c] * n + rows[r]]] for r in range(n) for c in range(n)]
+    return [digits[grid[rows[r] * n + cols[c]]] for r in range(n) for c in range(n)]
+
+def derive(grid, solution=None, rng=random):
+    """ Returns a random variant of a flat grid, or of a (puzzle, solution) pair if solution is given, with the
+        same transform applied to both. The variant has the same single solution and needs the same reasoning,
+        but its guess count rating does not survive the transform: the solver visits squares and values in a
+        fixed order, so a variant of a Medium or Hard puzzle often rates Insane and the other way round. Use
+        deriveLevel to serve a variant at a given level"""
+    transform = randomTransform(rng, sudokuSolver.boxSize(len(grid)))
+    if solution is None:
+        return applyTransform(grid, transform)
+    return applyTransform(grid, transform), applyTransform(solution, transform)
+
+def deriveLevel(grid, level, rng=random, tries=32):
+    """ Returns a random variant of a flat grid that sudokuSolver.solveGrid rates at level, trying up to tries
+        transforms. Returns the grid itself if none of them does. Each try solves the variant, so on 9x9 grids
+        a call takes from a fraction of a millisecond to over 10 ms, and belongs on a background thread"""
+    for i in range(tries):
+        variant = derive(grid, rng=rng)
+        s = sudokuSolver.solveGrid(variant)
+        if s != False and s[2] == level:
+            return variant
+    return list(grid)
@@ -66,4 +66,38 @@ def isLegalSudoku(board):
             return False
         if isLegalBlock(board, i) == False:
             return False
-    return True
\ No newline at end of file
+    return True
+
+import numpy as np
+def checkBoards(boards, chunk=65536):
+    #checks a whole stack of boards with shape (B, n, n) at once and returns
+    #two boolean arrays of length B: whether each board is legal, and whether
+    #it is legal and completely filled in. n must be a square number (9, 16...)
+    #and a single board must be passed as a stack of one
+    boards = np.asarray(boards)
+    if boards.size == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+    if boards.ndim != 3 or boards.shape[1] != boards.shape[2]:
+        raise ValueError('boards must have shape (B, n, n), not %s' % (boards.shape,))
+    B, n = boards.shape[0], boards.shape[1]
+    N = int(round(math.sqrt(n)))
+    if N * N != n:
+        raise ValueError('boards must be n by n with n a square number, not %d' % n)
+    #units[u] holds the flat indices of the squares in row, column or block u
+    squares = np.arange(n * n).reshape(n, n)
+    blocks = squares.reshape(N, N, N, N).transpose(0, 2, 1, 3).reshape(n, n)
+    units = np.concatenate([squares, squares.T, blocks])
+    legal = np.zeros(B, dtype=bool)
+    complete = np.zeros(B, dtype=bool)
+    for start in range(0, B, chunk):
+        #boards are checked in chunks to keep the gathered units small
+        flat = boards[start:start + chunk].reshape(-1, n * n).astype(np.int16)
+        m = flat.shape[0]
+        inRange = ((flat >= 0) & (flat <= n)).all(axis=1)
+        #after sorting each unit, a repeated number sits next to itself
+        values = np.sort(flat[:, units], axis=2)
+        repeats = (values[:, :, 1:] == values[:, :, :-1]) & (values[:, :, 1:] > 0)
+        ok = inRange & ~repeats.any(axis=(1, 2))
+        legal[start:start + m] = ok
+        complete[start:start + m] = ok & (flat > 0).all(axis=1)
+    return legal, complete
@@ -0,0 +1,238 @@
+# Sudoku capture - finds a printed sudoku in a camera frame, reads its digits and solves it
+
+# Usage: python sudokuCapture.py photo.jpg         reads and solves the sudoku in a photo
+#        python sudokuCapture.py --templates [font.ttf ...]   rebuilds digitTemplates.npz
+# The grid is the largest four sided contour in the frame, at any depth so that the outline of the sheet does not
+# hide it, whose inside shows the 10 by 10 grid lines of a sudoku once warped flat into a 288x288 image. That image
+# is cut into 81 cells of 32x32 in one reshape. Every cell is then scaled so its ink fills a 16x16 square, blurred
+# slightly, and all 81 are compared with the digit templates in digitTemplates.npz in one matrix product (1 nearest
+# neighbour on normalized pixels), among the templates with as many enclosed holes as the cell (counted for all
+# cells in one connectedComponents call), which keeps 6 apart from 5 and 8.
+# The templates are the digits 1 to 9 in OpenCV's Hershey fonts and in any TrueType fonts given (drawing those needs
+# Pillow), shrunk and thresholded exactly as camera cells are. The bundled file also has the DejaVu fonts.
+
+import os
+import sys
+import cv2
+import numpy as np
+import sudokuSolver
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'digitTemplates.npz')
+CELL = 32                                                                 # Side of one cell of the warped grid
+SIDE = 9 * CELL
+DRAWN = 96                                           # Side of the cell templates are drawn on before being shrunk
+BORDER = 4                                               # Pixels cleared along each cell edge to drop grid lines
+LINE = 3                                          # Pixels either side of where a grid line should be that it may be
+LINED = 0.8                                          # Least fraction of every grid line that must be ink for a grid
+SAMPLE = 16                                                       # Side of the square each digit is scaled to
+SMOOTH = 1.0                                                        # Blur of the scaled digits, in sampled pixels
+INK = 0.03                                                  # Least fraction of a cell that must be ink for a digit
+LOOPS = {1: (0,), 2: (0,), 3: (0,), 4: (0, 1), 5: (0,), 6: (1,), 7: (0,), 8: (2,), 9: (1,)}   # Holes in each digit
+FONTS = [cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_COMPLEX, cv2.FONT_HERSHEY_TRIPLEX,
+         cv2.FONT_HERSHEY_PLAIN]
+
+def orderCorners(points):
+    """ Orders 4 points as top left, top right, bottom right, bottom left"""
+    points = points.reshape(4, 2).astype(np.float32)
+    total = points.sum(axis=1)
+    diff = points[:, 1] - points[:, 0]
+    return np.array([points[total.argmin()], points[diff.argmin()], points[total.argmax()], points[diff.argmax()]])
+
+def hasGridLines(warped):
+    """ Returns True if a warped candidate shows the 10 rows and 10 columns of grid lines where a sudoku has them"""
+    ink = inkOf(warped)
+    # Ink within a few pixels of each line position, for every pixel along the line
+    near = np.clip(np.round(np.arange(10) * (SIDE - 1) / 9.0).astype(int)[:, None] + np.arange(-LINE, LINE + 1),
+                   0, SIDE - 1)
+    rows = ink[near].max(axis=1).mean(axis=1)
+    cols = ink[:, near].max(axis=2).mean(axis=0)
+    return rows.min() >= LINED and cols.min() >= LINED
+
+def findGrid(gray, minArea=0.1, candidates=10):
+    """ Returns the 4 corners of the largest four sided contour in a grayscale frame whose inside, warped flat, has
+        the grid lines of a sudoku, or None if there is none covering at least minArea of the frame. Every contour
+        is considered, not only the outermost ones, since a sheet held up to the camera usually stands out from the
+        background and has the grid inside its own outline"""
+    thresh = cv2.adaptiveThreshold(cv2.GaussianBlur(gray, (5, 5), 0), 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                   cv2.THRESH_BINARY_INV, 15, 7)
+    contours = cv2.findContours(thresh, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    for cnt in sorted(contours, key=cv2.contourArea, reverse=True)[:candidates]:
+        if cv2.contourArea(cnt) < minArea * gray.shape[0] * gray.shape[1]:
+            return None
+        approx = cv2.approxPolyDP(cnt, 0.02 * cv2.arcLength(cnt, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            corners = orderCorners(approx)
+            if hasGridLines(warpGrid(gray, corners)):
+                return corners
+    return None
+
+def warpGrid(gray, corners):
+    """ Warps the grid inside corners to a flat SIDE x SIDE image"""
+    square = np.array([[0, 0], [SIDE - 1, 0], [SIDE - 1, SIDE - 1], [0, SIDE - 1]], np.float32)
+    return cv2.warpPerspective(gray, cv2.getPerspectiveTransform(corners, square), (SIDE, SIDE))
+
+def inkOf(gray):
+    """ Returns 1 where a grayscale image is darker than its surroundings and 0 elsewhere"""
+    return cv2.adaptiveThreshold(gray, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 7)
+
+def cellInk(warped):
+    """ Returns the ink of all 81 cells of a warped grid as a (81, CELL, CELL) array of 0 and 1, with the cell
+        edges cleared"""
+    ink = inkOf(warped)
+    cells = ink.reshape(9, CELL, 9, CELL).transpose(0, 2, 1, 3).reshape(81, CELL, CELL).copy()
+    cells[:, :BORDER] = 0
+    cells[:, -BORDER:] = 0
+    cells[:, :, :BORDER] = 0
+    cells[:, :, -BORDER:] = 0
+    return cells
+
+def blur(images):
+    """ Blurs a stack of images with a small separable Gaussian, so that strokes a pixel or two apart still match"""
+    taps = np.exp(-np.arange(-2, 3) ** 2 / (2 * SMOOTH ** 2))
+    taps /= taps.sum()
+    padded = np.pad(images, ((0, 0), (2, 2), (0, 0)))
+    images = sum(t * padded[:, i:i + images.shape[1]] for i, t in enumerate(taps))
+    padded = np.pad(images, ((0, 0), (0, 0), (2, 2)))
+    return sum(t * padded[:, :, i:i + images.shape[2]] for i, t in enumerate(taps))
+
+def holes(cells):
+    """ Returns the number of enclosed holes in the ink of every cell: 2 for an 8, 1 for 4, 6 and 9, 0 otherwise.
+        The cells are laid side by side, each framed by a line of ink so no blank area spans two cells, and the
+        blank areas of all of them are labelled in one connectedComponents call. Every cell has one blank area
+        around its digit, and the rest are holes"""
+    count = len(cells)
+    framed = np.pad(1 - cells, ((0, 0), (1, 1), (1, 1)))
+    strip = np.ascontiguousarray(framed.transpose(1, 0, 2).reshape(CELL + 2, count * (CELL + 2)))
+    stats = cv2.connectedComponentsWithStats(strip, connectivity=4)[2]
+    return np.bincount(stats[1:, cv2.CC_STAT_LEFT] // (CELL + 2), minlength=count) - 1
+
+def features(cells):
+    """ Scales the ink of every cell so that it fills a SAMPLE x SAMPLE square, keeping its shape, and returns
+        them as rows of zero mean, unit length vectors along with a mask of the cells that have a digit"""
+    count = len(cells)
+    rows = cells.any(axis=2)
+    cols = cells.any(axis=1)
+    filled = cells.reshape(count, -1).mean(axis=1) >= INK
+    # Bounding box of the ink in each cell, grown to a square around its center
+    top = rows.argmax(axis=1)
+    bottom = CELL - rows[:, ::-1].argmax(axis=1)
+    left = cols.argmax(axis=1)
+    right = CELL - cols[:, ::-1].argmax(axis=1)
+    side = np.maximum(np.maximum(bottom - top, right - left), 1)
+    y0 = (top + bottom - side) / 2.0
+    x0 = (left + right - side) / 2.0
+    steps = (np.arange(SAMPLE) + .5) / SAMPLE
+    # Nearest neighbour sampling of all cells at once, on cells padded so the square may run over the edge
+    padded = np.pad(cells, ((0, 0), (CELL, CELL), (CELL, CELL)))
+    ys = (y0[:, None] + side[:, None] * steps).astype(int) + CELL
+    xs = (x0[:, None] + side[:, None] * steps).astype(int) + CELL
+    sampled = padded[np.arange(count)[:, None, None], ys[:, :, None], xs[:, None, :]].reshape(count, -1)
+    sampled = blur(sampled.reshape(count, SAMPLE, SAMPLE).astype(np.float32)).reshape(count, -1)
+    sampled -= sampled.mean(axis=1, keepdims=True)
+    sampled /= np.maximum(np.linalg.norm(sampled, axis=1, keepdims=True), 1e-6)
+    return sampled, filled
+
+def drawDigit(digit, font, thickness, scale):
+    """ Draws a digit in a Hershey font centered on a DRAWN x DRAWN cell"""
+    cell = np.zeros((DRAWN, DRAWN), np.uint8)
+    size = cv2.getTextSize(str(digit), font, scale, thickness)[0]
+    origin = ((DRAWN - size[0]) // 2, (DRAWN + size[1]) // 2)
+    cv2.putText(cell, str(digit), origin, font, scale, 255, thickness, cv2.LINE_AA)
+    return cell
+
+def drawTrueType(digit, path, height):
+    """ Draws a digit in a TrueType font centered on a DRAWN x DRAWN cell"""
+    from PIL import Image, ImageDraw, ImageFont
+    image = Image.new('L', (DRAWN, DRAWN), 0)
+    ImageDraw.Draw(image).text((DRAWN / 2, DRAWN / 2), str(digit), fill=255, anchor='mm',
+                               font=ImageFont.truetype(path, height))
+    return np.array(image)
+
+def buildTemplates(path=TEMPLATES, fontFiles=()):
+    """ Draws the digits 1 to 9 in every Hershey font, and in every TrueType font file in fontFiles (which needs
+        Pillow), at a few weights and sizes, and saves their features to path"""
+    images, labels = [], []
+    for digit in range(1, 10):
+        drawn = [drawDigit(digit, font, thickness, scale) for font in FONTS for thickness in (3, 5, 7)
+                 for scale in (1.6, 2.2, 2.8)]
+        drawn += [drawTrueType(digit, f, height) for f in fontFiles for height in (40, 52, 64)]
+        for cell in drawn:
+            # Shrunk to a gray camera sized cell and thresholded as camera cells are, so strokes come out as thick
+            images.append(inkOf(255 - cv2.resize(cell, (CELL, CELL), interpolation=cv2.INTER_AREA)))
+            labels.append(digit)
+    images, labels = np.array(images, np.uint8), np.array(labels, np.uint8)
+    # Drawings whose loops closed up or filled in when shrunk would teach the wrong shape, so they are dropped
+    loops = holes(images)
+    keep = np.array([h in LOOPS[d] for d, h in zip(labels, loops)])
+    images, loops, labels = images[keep], loops[keep], labels[keep]
+    feats = features(images)[0]
+    np.savez_compressed(path, features=feats, holes=loops, labels=labels)
+    return feats, loops, labels
+
+def loadTemplates(path=TEMPLATES):
+    """ Returns the template features, hole counts and labels, building the template file first if it is missing"""
+    if not os.path.exists(path):
+        return buildTemplates(path)
+    data = np.load(path)
+    return data['features'], data['holes'], data['labels']
+
+class sudokuCapture(object):
+    """ Reads printed sudokus from camera frames. read returns a board only once the same puzzle has been read
+        in steady frames in a row, so a misread frame is never loaded. corners holds the last grid found"""
+    def __init__(self, steady=3, path=TEMPLATES):
+        self.templates, self.holes, self.labels = loadTemplates(path)
+        self.steady = steady
+        self.corners = None
+        self.last = None
+        self.seen = 0
+
+    def readGrid(self, frame):
+        """ Returns the flat grid of digits read from a BGR frame (0 for an empty cell), or None if no grid is found"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self.corners = findGrid(gray)
+        if self.corners is None:
+            return None
+        cells = cellInk(warpGrid(gray, self.corners))
+        feats, filled = features(cells)
+        # A template with a different number of holes only wins if no template has the same number
+        scores = feats @ self.templates.T - 2 * (holes(cells)[:, None] != self.holes)
+        digits = self.labels[scores.argmax(axis=1)]
+        return [int(d) if f else 0 for d, f in zip(digits, filled)]
+
+    def read(self, frame):
+        """ Returns (board, solution) as lists of rows once a puzzle with exactly one solution has been read in
+            steady frames in a row, otherwise None"""
+        grid = self.readGrid(frame)
+        if grid is None or grid != self.last:
+            self.last = grid
+            self.seen = 0
+        if grid is None:
+            return None
+        self.seen += 1
+        if self.seen < self.steady or sudokuSolver.count_solutions(grid, maxGuesses = 1000) != 1:
+            return None
+        solution = sudokuSolver.solveGrid(grid)[0]
+        return sudokuSolver.boardFromGrid(grid), sudokuSolver.boardFromGrid(solution)
+
+def main(argv):
+    if argv and argv[0] == '--templates':
+        print(str(len(buildTemplates(TEMPLATES, argv[1:])[2])) + ' templates written to ' + TEMPLATES)
+        return
+    capture = sudokuCapture(steady=1)
+    image = cv2.imread(argv[0])
+    grid = capture.readGrid(image)
+    if grid is None:
+        print('No sudoku found')
+        return
+    for r in range(9):
+        print(' '.join(str(v) if v else '.' for v in grid[r * 9:(r + 1) * 9]))
+    s = sudokuSolver.solveGrid(grid) if sudokuSolver.count_solutions(grid, maxGuesses = 1000) == 1 else False
+    if s == False:
+        print('The digits read do not give a sudoku with one solution')
+        return
+    print('')
+    for row in sudokuSolver.boardFromGrid(s[0]):
+        print(' '.join(str(v) for v in row))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
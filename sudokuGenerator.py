@@ -5,19 +5,61 @@
 import time
 import copy
 import random
+import sudokuSolver
 
 level = "Medium"
 
+LEVELS = ['Easy', 'Medium', 'Hard', 'Insane']
+
+""" [Levels] = Levels of difficulty from easiest to hardest, as rated by the number of guesses the solver makes."""
+
+defaultEngine = "bitmask"
+
+""" [Default Engine] = Solver used by solve, puzzleGen, perfectSudoku and main when no engine is passed in.
+        'bitmask' uses the fast deterministic solver in sudokuSolver.py, 'cell' uses the original cell object solver."""
+
+GENERATOR_VERSION = 2
+
+""" [Generator Version] = Stored in every puzzle ID. Bump it whenever a change to the generators would turn a seed
+        into a different puzzle, so that old IDs are rejected instead of silently giving another board."""
+
+MAX_GUESSES = {3: 1000, 4: 1000, 5: 50}
+
+""" [Max Guesses] = Default maxGuesses of streamGen and targetedGen for each box size k. A guess costs far more on
+        larger boards, so 25x25 searches give up much sooner, which keeps a 25x25 puzzle to about 1 to 6 seconds
+        instead of up to half a minute."""
+
 """ [Level of Difficulty] = Input the level of difficulty of the sudoku puzzle. Difficulty levels
         include ‘Easy’ ‘Medium’ ‘Hard’ and ‘Insane’. Outputs a sudoku of desired
         difficulty."""
 
+counters = None
+
+""" [Counters] = None, or a generationStats (see generationStats.py) that the generators and solvers report their work to:
+        guesses, restarts, deep copies, sudokuChecker calls and the time spent in each phase."""
+
+def count(key, n = 1):
+    """ Adds n to a counter if counters are being kept"""
+    if counters is not None:
+        counters.add(key, n)
+
+def timed(phase, f, *args):
+    """ Calls f(*args) and returns its result. If counters are being kept the call and its time are added to phase"""
+    if counters is None:
+        return f(*args)
+    t1 = time.perf_counter()
+    try:
+        return f(*args)
+    finally:
+        counters.time(phase, time.perf_counter() - t1)
+
 class cell():
     """ Initilalizes cell object. A cell is a single box of a sudoku puzzle. 81 cells make up the body of a
         sudoku puzzle. Initializes puzzle with all possible answers available, solved to false, and position of cell within the
-        sudoku puzzle"""
-    def __init__(self, position):
-        self.possibleAnswers = [1,2,3,4,5,6,7,8,9]
+        sudoku puzzle. size is the largest answer, 9 unless the sudoku is larger (16 for 16x16)"""
+    def __init__(self, position, size = 9):
+        self.size = size
+        self.possibleAnswers = list(range(1, size + 1))
         self.answer = None
         self.position = position
         self.solved = False
@@ -58,7 +100,7 @@ class cell():
     def setAnswer(self, num):
         """ Sets an answer of a puzzle and sets a cell's solved method to true. This
             method also eliminates all other possible numbers"""
-        if num in [1,2,3,4,5,6,7,8,9]:
+        if num in range(1, self.size + 1):
             self.solved = True
             self.answer = num
             self.possibleAnswers = [num]
@@ -67,84 +109,47 @@ class cell():
        
     def reset(self):
         """ Resets all attributes of a cell to the original conditions""" 
-        self.possibleAnswers = [1,2,3,4,5,6,7,8,9]
+        self.possibleAnswers = list(range(1, self.size + 1))
         self.answer = None
         self.solved = False
 
-def emptySudoku():
+def emptySudoku(k = 3):
     ''' Creates an empty sudoku in row major form. Sets up all of the x, y, and z
-        coordinates for the sudoku cells'''
+        coordinates for the sudoku cells. Boxes are k by k cells, so the sudoku has k**4 cells'''
+    n = k * k
     ans = []
-    for x in range(1,10):
-        if x in [7,8,9]:
-            intz = 7
-            z = 7
-        if x in [4,5,6]:
-            intz = 4
-            z = 4
-        if x in [1,2,3]:
-            intz = 1
-            z = 1
-        for y in range(1,10):
-            z = intz
-            if y in [7,8,9]:
-                z += 2
-            if y in [4,5,6]:
-                z += 1
-            if y in [1,2,3]:
-                z += 0
-            c = cell((x,y,z))
+    for x in range(1, n + 1):
+        for y in range(1, n + 1):
+            z = ((x - 1) // k) * k + (y - 1) // k + 1
+            c = cell((x,y,z), n)
             ans.append(c)
     return ans
 
+def isBitmask(engine):
+    ''' Returns True if engine, or defaultEngine when engine is None, is the bitmask solver'''
+    return (engine or defaultEngine) == 'bitmask'
+
+def cellsFromGrid(grid):
+    ''' Creates a sudoku of cell objects from a flat list of ints (81 for a 9x9 sudoku), 0 for an empty cell'''
+    sudoku = emptySudoku(sudokuSolver.boxSize(len(grid)))
+    for i in range(len(grid)):
+        if grid[i]:
+            sudoku[i].setAnswer(grid[i])
+    return sudoku
+
 def printSudoku(sudoku):
     '''Prints out a sudoku in a format that is easy for a human to read'''
-    row1 = []
-    row2 = []
-    row3 = []
-    row4 = []
-    row5 = []
-    row6 = []
-    row7 = []
-    row8 = []
-    row9 = []
-    for i in range(81):
-        if i in range(0,9):
-            row1.append(sudoku[i].returnSolved())
-        if i in range(9,18):
-            row2.append(sudoku[i].returnSolved())
-        if i in range(18,27):
-            row3.append(sudoku[i].returnSolved())
-        if i in range(27,36):
-            row4.append(sudoku[i].returnSolved())
-        if i in range(36,45):
-            row5.append(sudoku[i].returnSolved())
-        if i in range(45,54):
-            row6.append(sudoku[i].returnSolved())
-        if i in range(54,63):
-            row7.append(sudoku[i].returnSolved())
-        if i in range(63,72):
-            row8.append(sudoku[i].returnSolved())
-        if i in range(72,81):
-            row9.append(sudoku[i].returnSolved())
-    board = [row1,row2,row3,row4,row5,row6,row7,row8,row9]
+    n = sudokuSolver.boxSize(len(sudoku)) ** 2
+    board = []
+    for r in range(n):
+        board.append([sudoku[i].returnSolved() for i in range(r * n, (r + 1) * n)])
     return board
-    # print(row1[0:3],row1[3:6],row1[6:10])
-    # print(row2[0:3],row2[3:6],row2[6:10])
-    # print(row3[0:3],row3[3:6],row3[6:10])
-    # print('')
-    # print(row4[0:3],row4[3:6],row4[6:10])
-    # print(row5[0:3],row5[3:6],row5[6:10])
-    # print(row6[0:3],row6[3:6],row6[6:10])
-    # print('')
-    # print(row7[0:3],row7[3:6],row7[6:10])
-    # print(row8[0:3],row8[3:6],row8[6:10])
-    # print(row9[0:3],row9[3:6],row9[6:10])
-
-def sudokuGen():
+
+def sudokuGen(k = 3, rng = None):
     '''Generates a completed sudoku. Sudoku is completly random'''
-    cells = [i for i in range(81)] ## our cells is the positions of cells not currently set
-    sudoku = emptySudoku()
+    rng = rng or random
+    sudoku = emptySudoku(k)
+    cells = [i for i in range(len(sudoku))] ## our cells is the positions of cells not currently set
     while len(cells) != 0:
         lowestNum = []
         Lowest = []
@@ -156,13 +161,13 @@ def sudokuGen():
             if sudoku[i].lenOfPossible() == m:
                 Lowest.append(sudoku[i])
         '''Now we randomly choose a possible answer and set it to the cell'''
-        choiceElement = random.choice(Lowest)
+        choiceElement = rng.choice(Lowest)
         choiceIndex = sudoku.index(choiceElement) 
         cells.remove(choiceIndex)                 
         position1 = choiceElement.checkPosition()
         if choiceElement.solvedMethod() == False:  ##the actual setting of the cell
             possibleValues = choiceElement.returnPossible()
-            finalValue = random.choice(possibleValues)
+            finalValue = rng.choice(possibleValues)
             choiceElement.setAnswer(finalValue)
             for i in cells:  ##now we iterate through the remaining unset cells and remove the input if it's in the same row, col, or box
                 position2 = sudoku[i].checkPosition()
@@ -200,30 +205,39 @@ def sudokuChecker(sudoku):
                         return False
     return True
 
-def perfectSudoku():
-    '''Generates a completed sudoku. Sudoku is in the correct format and is completly random'''
+def perfectSudoku(engine=None, k = 3, rng = None):
+    '''Generates a completed sudoku with k by k boxes. Sudoku is in the correct format and is completly random'''
+    rng = rng or random
+    if isBitmask(engine):
+        return cellsFromGrid(timed('randomGrid', sudokuSolver.randomGrid, rng, k))
     result = False
     while result == False:
-        s = sudokuGen()
-        result = sudokuChecker(s)
+        s = timed('sudokuGen', sudokuGen, k, rng)
+        result = timed('sudokuChecker', sudokuChecker, s)
+        if result == False:
+            count('gridRejections')
     return s
 
-def solver(sudoku, f = 0):
+def solver(sudoku, f = 0, rng = None):
     """ Input an incomplete Sudoku puzzle and solver method will return the solution to the puzzle. First checks to see if any obvious answers can be set
         then checks the rows columns and boxes for obvious solutions. Lastly the solver 'guesses' a random possible answer from a random cell and checks to see if that is a
         possible answer. If the 'guessed' answer is incorrect, then it removes the guess and tries a different answer in a different cell and checks for a solution. It does this until
         all of the cells have been solved. Returns a printed solution to the puzzle and the number of guesses that it took to complete the puzzle. The number of guesses is
         a measure of the difficulty of the puzzle. The more guesses that it takes to solve a given puzzle the more challenging it is to solve the puzzle"""
+    rng = rng or random
     if f > 900:
         return False
+    if f > 0:
+        count('solverRestarts')
     guesses = 0
-    copy_s = copy.deepcopy(sudoku)
-    cells = [i for i in range(81)] ## our cells is the positions of cells not currently set
+    copy_s = timed('deepcopy', copy.deepcopy, sudoku)
+    cells = [i for i in range(len(copy_s))] ## our cells is the positions of cells not currently set
     solvedCells = []
     for i in cells:
         if copy_s[i].lenOfPossible() == 1:
             solvedCells.append(i)
     while solvedCells != []:
+        count('propagations')
         for n in solvedCells:
             cell = copy_s[n]
             position1 = cell.checkPosition()
@@ -250,13 +264,14 @@ def solver(sudoku, f = 0):
             for i in cells:
                 if copy_s[i].lenOfPossible() == m:
                     lowest.append(copy_s[i])
-            randomChoice = random.choice(lowest)
+            randomChoice = rng.choice(lowest)
             randCell = copy_s.index(randomChoice)
-            randGuess = random.choice(copy_s[randCell].returnPossible())
+            randGuess = rng.choice(copy_s[randCell].returnPossible())
             copy_s[randCell].setAnswer(randGuess)
             solvedCells.append(randCell)
             guesses += 1
-    if sudokuChecker(copy_s):
+    count('guesses', guesses)
+    if timed('sudokuChecker', sudokuChecker, copy_s):
         if guesses == 0:
             level = 'Easy'
         elif guesses <= 2:
@@ -267,42 +282,48 @@ def solver(sudoku, f = 0):
             level = 'Insane'
         return copy_s, guesses, level
     else:
-        return solver(sudoku, f+1)
+        return solver(sudoku, f+1, rng)
     
-def solve(sudoku, n = 0):
+def solve(sudoku, n = 0, engine = None, rng = None):
     """ Uses the solver method to solve a puzzle. This method was built in order to avoid recursion depth errors. Returns True if the puzzle is solvable and
         false if otherwise"""
+    if isBitmask(engine):
+        s = sudokuSolver.solveGrid(sudokuSolver.gridFromCells(sudoku))
+        if s == False:
+            count('solveFailures')
+            return False
+        return cellsFromGrid(s[0]), s[1], s[2]
     if n < 30:
-        s = solver(sudoku)
+        if n > 0:
+            count('solveRestarts')
+        s = timed('solver', solver, sudoku, 0, rng)
         if s != False:
             return s
         else:
-            solve(sudoku, n+1)
+            return solve(sudoku, n+1, 'cell', rng)
     else:
+        count('solveFailures')
         return False
     
-def puzzleGen(sudoku):
-    """ Generates a puzzle with a unique solution. """
-    cells = [i for i in range(81)]
-    while cells != []:
-        copy_s = copy.deepcopy(sudoku)
-        randIndex = random.choice(cells)
-        cells.remove(randIndex)
-        copy_s[randIndex].reset()
-        s = solve(copy_s)
-        if s[0] == False:
-            f = solve(sudoku)
-            print("Guesses: " + str(f[1]))
-            print("Level: " + str(f[2]))
-            return printSudoku(sudoku)
-        elif equalChecker(s[0],solve(copy_s)[0]):
-            if equalChecker(s[0],solve(copy_s)[0]):
-                sudoku[randIndex].reset()
-        else:
-            f = solve(sudoku)
-##            print("Guesses: " + str(f[1]))
-##            print("Level: " + str(f[2]))
-            return sudoku, f[1], f[2]
+def puzzleGen(sudoku, engine = None, rng = None):
+    """ Generates a puzzle with a unique solution. Cells are emptied in a random order until emptying one
+        would allow a second solution. Each removal is checked with a single count_solutions search that
+        stops at the second solution. The engine is only used to rate the finished puzzle"""
+    rng = rng or random
+    count('digs')
+    grid = sudokuSolver.gridFromCells(sudoku)
+    cells = [i for i in range(len(grid))]
+    rng.shuffle(cells)
+    for i in cells:
+        value = grid[i]
+        grid[i] = 0
+        count('removals')
+        if timed('countSolutions', sudokuSolver.count_solutions, grid) != 1:
+            grid[i] = value
+            break
+        sudoku[i].reset()
+    f = timed('rate', solve, sudoku, 0, engine, rng)
+    return sudoku, f[1], f[2]
 
 def equalChecker(s1,s2):
     """ Checks to see if two puzzles are the same"""
@@ -311,76 +332,185 @@ def equalChecker(s1,s2):
             return False
     return True
 
-def main(level):
+def stopped(deadline = None, cancel = None):
+    """ Returns True once time.monotonic() has passed the deadline or the cancel token (anything with an is_set
+        method, such as a threading.Event) has been set. Either can be None"""
+    return (deadline is not None and time.monotonic() >= deadline) or (cancel is not None and cancel.is_set())
+
+def closer(a, b, level):
+    """ Returns whichever of two (sudoku, guesses, level) puzzles is closer to the level. A puzzle of a nearer level
+        wins, then the one whose guess count is nearer, so of two puzzles that are too easy the harder one wins"""
+    if a is None:
+        return b
+    target = LEVELS.index(level)
+    def distance(s):
+        n = LEVELS.index(s[2]) - target
+        return abs(n), s[1] if n > 0 else -s[1]
+    return b if distance(b) < distance(a) else a
+
+def streamGen(level, deadline = None, cancel = None, tries = None, stats = None, k = 3, maxGuesses = None, rng = None):
+    """ Generates puzzles of the given level by steering the digging toward it instead of rejecting whole puzzles.
+        Cells of a fresh grid are emptied in a random order and the puzzle is re-rated after every removal, which
+        is kept only if the solution stays unique. A removal that makes the puzzle harder than the level is put
+        back, and once the level is reached only removals that keep it there are made (the hardest level has no
+        upper limit, so digging stops as soon as it is reached). Removals whose searches need more than maxGuesses
+        guesses (MAX_GUESSES[k] by default) are put back, which keeps every step bounded on large boards. Boxes
+        are k by k.
+        Every dug grid is yielded as a (sudoku, guesses, level) puzzle, and the generator stops after yielding one
+        of the level, after tries grids, or once stopped(deadline, cancel) is True, which is checked between
+        removals. A later grid cut short is dropped, but the first one is still yielded so there is always a
+        puzzle: if the deadline passes while it is dug, rating stops and only removals that leave it solvable
+        without guessing are made, until half its squares are empty, and if the cancel token is set it is yielded
+        as it stands. So a deadline is overrun by at most filling a grid and that quick dig, about 5 ms on 9x9,
+        0.1 s on 16x16 and 0.7 s on 25x25 boards, and a cancel by at most filling a grid (0.3 s on 25x25).
+        The closest puzzle found is the return value of the generator. The number of grids used is added to
+        stats['grids'] if a dict is passed in"""
+    rng = rng or random
+    if maxGuesses is None:
+        maxGuesses = MAX_GUESSES.get(k, 50)
+    target = LEVELS.index(level)
+    # Rating gives up as soon as the puzzle is known to be too hard
+    cap = sudokuSolver.LIMITS[target] if target < len(sudokuSolver.LIMITS) else maxGuesses
+    best = None
+    t = 0
+    while tries is None or t < tries:
+        t += 1
+        if stats is not None:
+            stats['grids'] = stats.get('grids', 0) + 1
+        grid = timed('randomGrid', sudokuSolver.randomGrid, rng, k)
+        guesses = 0
+        cells = [i for i in range(len(grid))]
+        rng.shuffle(cells)
+        cut = False
+        quick = False
+        empty = 0
+        for i in cells:
+            if stopped(deadline, cancel):
+                # Later grids are dropped, and the first is served as it stands or finished with the quick dig
+                if best is not None:
+                    cut = True
+                    break
+                if (cancel is not None and cancel.is_set()) or guesses > 0 or 2 * empty >= len(grid):
+                    break
+                quick = True
+            value = grid[i]
+            grid[i] = 0
+            count('removals')
+            if quick:
+                # Solving without a guess needs no search, so this part of the dig takes a bounded time, and
+                # the puzzle stays unique and Easy
+                if timed('rate', sudokuSolver.solveGrid, grid, 0) == False:
+                    grid[i] = value
+                else:
+                    empty += 1
+                continue
+            s = timed('rate', sudokuSolver.solveGrid, grid, cap)
+            if s != False:
+                g = s[1]
+                rating = LEVELS.index(s[2])
+                current = LEVELS.index(sudokuSolver.rate(guesses))
+            if s != False and rating <= target and (current < target or rating == target):
+                # A puzzle solved without guessing has only one solution, so the count is only needed after a guess
+                if g == 0 or timed('countSolutions', sudokuSolver.count_solutions, grid, 2, maxGuesses) == 1:
+                    guesses = g
+                    empty += 1
+                    if rating == len(LEVELS) - 1:
+                        break
+                    continue
+            grid[i] = value
+        # A grid cut short may have had hardly anything removed, so it is never served
+        if cut:
+            break
+        puzzle = (cellsFromGrid(grid), guesses, sudokuSolver.rate(guesses))
+        best = closer(best, puzzle, level)
+        yield puzzle
+        if puzzle[2] == level or stopped(deadline, cancel):
+            break
+    return best
+
+def targetedGen(level, tries = 20, stats = None, k = 3, maxGuesses = None, rng = None, deadline = None, cancel = None):
+    """ Runs streamGen and returns its puzzle of the level, or the closest puzzle found if tries grids, the
+        deadline or the cancel token ran out first, so the time taken is bounded"""
+    best = None
+    for s in streamGen(level, deadline, cancel, tries, stats, k, maxGuesses, rng):
+        best = closer(best, s, level)
+    return best
+
+def rejectionGen(level, engine = None, k = 3, rng = None, deadline = None, cancel = None):
+    """ The original generator: grids are dug with puzzleGen until a puzzle rates at the level. For harder levels
+        the same grid is dug up to 50 more times, getting harder each time, before starting over. Once
+        stopped(deadline, cancel) is True the closest puzzle dug so far is returned"""
+    target = LEVELS.index(level)
+    best = None
+    while True:
+        p = perfectSudoku(engine, k, rng)
+        s = puzzleGen(p, engine, rng)
+        n = 0
+        while LEVELS.index(s[2]) < target and n < 50 and not stopped(deadline, cancel):
+            n += 1
+            s = puzzleGen(p, engine, rng)
+        if s[2] == level:
+            return s
+        best = closer(best, (copy.deepcopy(s[0]),) + s[1:], level)
+        if stopped(deadline, cancel):
+            return best
+
+def main(level, engine = None, verbose = True, k = 3, rng = None, timeout = None, cancel = None):
     """ Input the level of difficulty of the sudoku puzzle. Difficulty levels
         include ‘Easy’ ‘Medium’ ‘Hard’ and ‘Insane’. Outputs a sudoku of desired
-        difficulty."""
+        difficulty. The runtime, guesses and level are printed if verbose is True.
+        The bitmask engine uses targetedGen, the cell engine uses rejectionGen. Boxes are
+        k by k, so k = 4 makes a 16x16 sudoku. If timeout (in seconds) runs out or the cancel
+        token is set first, the closest puzzle found so far is returned instead (see streamGen
+        for how far the bitmask engine can overrun them)."""
+    if level not in LEVELS:
+        raise(ValueError)
     t1 = time.time()
-    n = 0
-    if level == 'Easy':
-        p = perfectSudoku()
-        s = puzzleGen(p)
-        if s[2] != 'Easy':
-            return main(level)
-        t2 = time.time()
-        t3 = t2 - t1
-        print("Runtime is " + str(t3) + " seconds")
-        print("Guesses: " + str(s[1]))
-        print("Level: " + str(s[2]))
-        return printSudoku(s[0])
-    if level == 'Medium':
-        p = perfectSudoku()
-        s = puzzleGen(p)
-        while s[2] == 'Easy':
-            n += 1
-            s = puzzleGen(p)
-            if n > 50:
-                return main(level)
-        if s[2] != 'Medium':
-            return main(level)
-        t2 = time.time()
-        t3 = t2 - t1
-        print("Runtime is " + str(t3) + " seconds")
-        print("Guesses: " + str(s[1]))
-        print("Level: " + str(s[2]))
-        return printSudoku(s[0])
-    if level == 'Hard':
-        p = perfectSudoku()
-        s = puzzleGen(p)
-        while s[2] == 'Easy':
-            n += 1
-            s = puzzleGen(p)
-            if n > 50:
-                return main(level)
-        while s[2] == 'Medium':
-            n += 1
-            s = puzzleGen(p)
-            if n > 50:
-                return main(level)
-        if s[2] != 'Hard':
-            return main(level)
-        t2 = time.time()
-        t3 = t2 - t1
-        print("Runtime is " + str(t3) + " seconds")
-        print("Guesses: " + str(s[1]))
-        print("Level: " + str(s[2]))
-        return printSudoku(s[0])
-    if level == 'Insane':
-        p = perfectSudoku()
-        s = puzzleGen(p)
-        while s[2] != 'Insane':
-            n += 1
-            s = puzzleGen(p)
-            if n > 50:
-                return main(level)
-        t2 = time.time()
-        t3 = t2 - t1
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if isBitmask(engine):
+        # With a time limit, grids are dug until the limit instead of a fixed number of tries
+        tries = 20 if deadline is None else None
+        s = targetedGen(level, tries, k = k, rng = rng, deadline = deadline, cancel = cancel)
+    else:
+        s = rejectionGen(level, engine, k, rng, deadline, cancel)
+    t2 = time.time()
+    t3 = t2 - t1
+    if verbose:
         print("Runtime is " + str(t3) + " seconds")
         print("Guesses: " + str(s[1]))
         print("Level: " + str(s[2]))
-        return printSudoku(s[0])
-    else:
+    return printSudoku(s[0])
+
+def puzzleId(seed, level, k = 3):
+    """ Packs a seed, level and box size into a 64 bit puzzle ID: 8 bits of generator version, 4 bits of k,
+        4 bits of level and 48 bits of seed. puzzleFromId rebuilds the puzzle from the ID, and
+        idToBytes turns it into the 8 bytes that are stored or sent instead of the board"""
+    if level not in LEVELS or not 0 <= seed < 1 << 48 or not 0 < k < 16:
         raise(ValueError)
+    return GENERATOR_VERSION << 56 | k << 52 | LEVELS.index(level) << 48 | seed
+
+def splitId(id):
+    """ Returns the (version, seed, level, k) packed into a puzzle ID"""
+    return id >> 56, id & ((1 << 48) - 1), LEVELS[(id >> 48) & 15], (id >> 52) & 15
+
+def idToBytes(id):
+    return id.to_bytes(8, 'big')
+
+def idFromBytes(data):
+    return int.from_bytes(data, 'big')
+
+def puzzleFromId(id):
+    """ Regenerates the puzzle with the given ID. The same ID always gives the same board, as long as it was made
+        by this GENERATOR_VERSION. IDs from other versions raise ValueError"""
+    version, seed, level, k = splitId(id)
+    if version != GENERATOR_VERSION:
+        raise ValueError('puzzle ID is from generator version ' + str(version))
+    return main(level, 'bitmask', False, k, random.Random(seed))
+
+def newPuzzle(level, k = 3):
+    """ Generates a puzzle from a fresh random seed. Returns the puzzle ID and the board"""
+    id = puzzleId(random.getrandbits(48), level, k)
+    return id, puzzleFromId(id)
 
 # main(level)
 
@@ -0,0 +1,237 @@
+# Bitmask sudoku solver - fast deterministic engine used by sudokuGenerator
+
+# A board is a flat list of n*n ints in row major order, 0 for an empty square, where n = k*k for boxes of
+# k by k squares (81 ints for the usual 9x9 sudoku, 256 for 16x16, 625 for 25x25).
+# Candidates are kept as n bit masks (bit d-1 set means digit d is still possible).
+
+# Set counters to a generationStats (see generationStats.py) to have every search report its guesses,
+# propagation passes and backtracks (guesses that led to a contradiction).
+counters = None
+
+class geometry(object):
+    """ Lookup tables for boards with k by k boxes: rows, columns and boxes of every square, the 3n units and
+        the peers of every square (the squares sharing a row, column or box with it)"""
+    def __init__(self, k):
+        n = k * k
+        self.k = k
+        self.n = n
+        self.size = n * n
+        self.all = (1 << n) - 1
+        self.row = [i // n for i in range(self.size)]
+        self.col = [i % n for i in range(self.size)]
+        self.box = [(i // (n * k)) * k + (i % n) // k for i in range(self.size)]
+        self.units = [[r * n + c for c in range(n)] for r in range(n)] + \
+                     [[r * n + c for r in range(n)] for c in range(n)] + \
+                     [[i for i in range(self.size) if self.box[i] == b] for b in range(n)]
+        self.peers = [tuple(p for p in range(self.size) if p != i and (self.row[p] == self.row[i] or
+                      self.col[p] == self.col[i] or self.box[p] == self.box[i])) for i in range(self.size)]
+        if n <= 9:
+            self.popcount = [bin(m).count('1') for m in range(self.all + 1)].__getitem__
+        else:
+            self.popcount = lambda m: bin(m).count('1')
+
+geometries = {}
+
+def geometryOf(k):
+    """ Returns the (cached) geometry for boxes of k by k squares"""
+    if k not in geometries:
+        geometries[k] = geometry(k)
+    return geometries[k]
+
+def boxSize(length):
+    """ Returns k for a flat grid of the given length, which must be k**4"""
+    k = int(round(length ** 0.25))
+    if k ** 4 != length:
+        raise ValueError('a grid must have k**4 squares, not ' + str(length))
+    return k
+
+def gridFromCells(sudoku):
+    """ Converts a list of cell objects from sudokuGenerator into a flat grid of ints"""
+    return [c.returnSolved() for c in sudoku]
+
+def gridFromBoard(board):
+    """ Converts a list of rows (as returned by printSudoku) into a flat grid of ints"""
+    return [value for row in board for value in row]
+
+def boardFromGrid(grid):
+    """ Converts a flat grid of ints into a list of rows"""
+    n = boxSize(len(grid)) ** 2
+    return [list(grid[r * n:(r + 1) * n]) for r in range(n)]
+
+def candidates(grid, geo):
+    """ Returns the candidate masks for every square of a grid, or None if two givens clash.
+        Givens are checked with one bitmask per row, column and box"""
+    rows = [0] * geo.n
+    cols = [0] * geo.n
+    boxes = [0] * geo.n
+    row, col, box = geo.row, geo.col, geo.box
+    for i in range(geo.size):
+        d = grid[i]
+        if d:
+            bit = 1 << (d - 1)
+            if d > geo.n or (rows[row[i]] | cols[col[i]] | boxes[box[i]]) & bit:
+                return None
+            rows[row[i]] |= bit
+            cols[col[i]] |= bit
+            boxes[box[i]] |= bit
+    cand = []
+    for i in range(geo.size):
+        if grid[i]:
+            cand.append(1 << (grid[i] - 1))
+        else:
+            cand.append(geo.all & ~(rows[row[i]] | cols[col[i]] | boxes[box[i]]))
+    return cand
+
+def _assign(cand, grid, i, bit, queue, peers):
+    """ Places the digit given by bit in square i and removes it from every peer. Peers left
+        with a single candidate are queued. Returns False on a contradiction"""
+    grid[i] = bit.bit_length()
+    cand[i] = bit
+    for p in peers[i]:
+        m = cand[p]
+        if m & bit:
+            m ^= bit
+            if not m:
+                return False
+            cand[p] = m
+            if not grid[p] and not m & (m - 1):
+                queue.append(p)
+    return True
+
+def _propagate(cand, grid, queue, hidden, geo):
+    """ Fills in naked singles (and hidden singles if hidden is True) until nothing changes.
+        Returns False if the grid cannot be completed"""
+    peers = geo.peers
+    while True:
+        while queue:
+            i = queue.pop()
+            if not grid[i] and not _assign(cand, grid, i, cand[i], queue, peers):
+                return False
+        if not hidden:
+            return True
+        found = False
+        for unit in geo.units:
+            once = twice = placed = 0
+            for i in unit:
+                m = cand[i]
+                if grid[i]:
+                    placed |= m
+                else:
+                    twice |= once & m
+                    once |= m
+            if (once | placed) != geo.all:
+                return False
+            only = once & ~twice & ~placed
+            while only:
+                bit = only & -only
+                only ^= bit
+                for i in unit:
+                    if not grid[i] and cand[i] & bit:
+                        break
+                else:
+                    return False
+                if not _assign(cand, grid, i, bit, queue, peers):
+                    return False
+                found = True
+        if not found:
+            return True
+
+def _search(cand, grid, hidden, limit, solutions, stats, rng, descending, geo, maxGuesses):
+    """ Depth first search that always branches on the empty square with the fewest candidates"""
+    popcount = geo.popcount
+    best = -1
+    bestCount = geo.n + 1
+    for i in range(geo.size):
+        if not grid[i]:
+            n = popcount(cand[i])
+            if n < bestCount:
+                best, bestCount = i, n
+                if n == 2:
+                    break
+    if best < 0:
+        solutions.append(grid[:])
+        return
+    m = cand[best]
+    bits = []
+    while m:
+        bit = m & -m
+        m ^= bit
+        bits.append(bit)
+    if rng is not None:
+        rng.shuffle(bits)
+    elif descending:
+        bits.reverse()
+    for bit in bits:
+        stats['guesses'] += 1
+        if maxGuesses is not None and stats['guesses'] > maxGuesses:
+            return
+        c2 = cand[:]
+        g2 = grid[:]
+        queue = []
+        stats['propagations'] += 1
+        if _assign(c2, g2, best, bit, queue, geo.peers) and _propagate(c2, g2, queue, hidden, geo):
+            _search(c2, g2, hidden, limit, solutions, stats, rng, descending, geo, maxGuesses)
+            if len(solutions) >= limit or (maxGuesses is not None and stats['guesses'] > maxGuesses):
+                return
+        else:
+            stats['backtracks'] += 1
+
+def search(grid, limit=1, hidden=True, rng=None, descending=False, maxGuesses=None):
+    """ Finds up to limit solutions of grid. Returns a list of solved grids and the number of
+        guesses made. Values are tried in ascending order, in descending order if descending is
+        True, or shuffled if a random.Random is passed in as rng. If more than maxGuesses guesses
+        are needed the search gives up and returns maxGuesses + 1 as the number of guesses"""
+    geo = geometryOf(boxSize(len(grid)))
+    stats = {'guesses': 0, 'propagations': 1, 'backtracks': 0}
+    solutions = []
+    cand = candidates(grid, geo)
+    if cand is None or 0 in cand:
+        return solutions, 0
+    grid = list(grid)
+    queue = [i for i in range(geo.size) if not grid[i] and not cand[i] & (cand[i] - 1)]
+    if _propagate(cand, grid, queue, hidden, geo):
+        _search(cand, grid, hidden, limit, solutions, stats, rng, descending, geo, maxGuesses)
+    if counters is not None:
+        for key in stats:
+            counters.add(key, stats[key])
+    return solutions, stats['guesses']
+
+# Most guesses an Easy, Medium and Hard puzzle can take. Anything more is Insane
+LIMITS = [0, 2, 7]
+
+def rate(guesses):
+    """ Converts a guess count into a level of difficulty, using the same thresholds as sudokuGenerator.solver"""
+    if guesses == 0:
+        return 'Easy'
+    elif guesses <= 2:
+        return 'Medium'
+    elif guesses <= 7:
+        return 'Hard'
+    else:
+        return 'Insane'
+
+def solveGrid(grid, maxGuesses=None):
+    """ Solves a grid. Returns the solution, the number of guesses and the level of difficulty, or False
+        if the grid has no solution (or needs more than maxGuesses guesses). On 9x9 grids only naked singles are propagated while rating so that
+        the guess count means the same as it does for sudokuGenerator.solver. Larger grids also use hidden
+        singles, since guessing on every square that is not a naked single takes far too long there"""
+    solutions, guesses = search(grid, 1, hidden=boxSize(len(grid)) > 3, maxGuesses=maxGuesses)
+    if not solutions:
+        return False
+    return solutions[0], guesses, rate(guesses)
+
+def count_solutions(board, limit=2, maxGuesses=None):
+    """ Counts the solutions of board, a flat grid or a list of rows, stopping as soon as limit
+        solutions have been found. With the default limit a result of 1 proves the solution is unique.
+        Returns None if the search gives up after maxGuesses guesses"""
+    if isinstance(board[0], list):
+        board = gridFromBoard(board)
+    solutions, guesses = search(board, limit, maxGuesses=maxGuesses)
+    if maxGuesses is not None and guesses > maxGuesses:
+        return None
+    return len(solutions)
+
+def randomGrid(rng, k=3):
+    """ Returns a random completed grid with k by k boxes, filled by the search with shuffled value order.
+        rng is anything with a shuffle method, such as the random module"""
+    return search([0] * k ** 4, 1, True, rng)[0][0]
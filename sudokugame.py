@@ -5,18 +5,24 @@ import cv2
 import numpy as np
 import math
 import copy
+import sys
 from handtrackingclass import handTracking
-import sudokuGenerator # Outside code from
-# https://github.com/JoeKarlsson/python-sudoku-generator-solver/blob/master/sudoku.py
+from visionProcess import visionProcess
 from sudoku import *
+from puzzlePool import puzzlePool
+from boardState import boardState
+from sudokuCapture import sudokuCapture
 
 class SudokuOpenCV(object):
-    def __init__(self):
+    def __init__(self, separateProcess=False):
         pygame.init()
-        self.h = handTracking()
+        self.h = visionProcess() if separateProcess else handTracking()     # Hand tracking in its own process or inline
         self.screenSize = self.h.getScreenSize()                               # Gets frame dimensions from handTracking
         self.margin = 20
         self.running = True
+        self.pool = puzzlePool(library='puzzles.lib')   # Serves boards from puzzles.lib if it exists, or generates them
+        self.pool.start()
+        self.capture = sudokuCapture()                                     # Reads printed sudokus held up to the camera
         self.screen = pygame.display.set_mode(self.screenSize)
         pygame.display.set_caption('OpenCV Sudoku')
         self.width, self.height = self.screenSize[0], self.screenSize[1]
@@ -48,7 +54,7 @@ class SudokuOpenCV(object):
         #         [2,3,5,7,4,8,9,1,6]
         #         ]
 
-        self.oBoard = copy.deepcopy(self.board)       # Copy of the original board to check for new inputs to self.board
+        SudokuOpenCV.newBoard(self, self.board)                    # Tracks the original board, moves, legality and wins
         self.gameState = 0
         self.inGame = False                               # Used to check if the player is currently in a game of sudoku
         self.black = (0,0,0)
@@ -57,12 +63,14 @@ class SudokuOpenCV(object):
         self.red = (255,0,0)
         self.green = (0,255,0)
         self.blue = (0,0,255)
+        self.showCandidates = False                                  # Pencil marks are drawn in empty squares when True
+        self.showStats = False                                      # Camera frame drops and latency are shown when True
 
     def drawBoard(self):                                                              # Draws sudoku board on the screen
         tlCorner = ((self.width/2) - self.boardDim/2, self.margin)                                     # Top left corner
         brCorner = ((self.width/2) + self.boardDim/2, self.height - self.margin)                   # Bottom right corner
-        for i in range(0, 10):
-            if i % 3 == 0:                                           # Makes thicker lines every 3rd line to show blocks
+        for i in range(0, self.n + 1):
+            if i % self.N == 0:                                         # Makes thicker lines every block to show blocks
                 pygame.draw.line(self.screen, self.black, (tlCorner[0] + i * self.unit, tlCorner[1]),
                                  (tlCorner[0] + i * self.unit, brCorner[1]), 3)
                 pygame.draw.line(self.screen, self.black, (tlCorner[0],  tlCorner[1] + i * self.unit),
@@ -75,16 +83,25 @@ class SudokuOpenCV(object):
         return tlCorner, brCorner
 
     def cvToPy(image):                                                           # Converts OpenCV image to Pygame image
-        return pygame.image.frombuffer(image.tostring(), image.shape[1::-1], "RGB")
+        # The surface shares the frame's memory instead of copying it. A frame from visionProcess stays locked
+        # until the next loop(), and every surface made here is blitted before then
+        return pygame.image.frombuffer(np.ascontiguousarray(image), image.shape[1::-1], "RGB")
 
     def dist(point1, point2):                                                        # Finds distance between two points
         return math.sqrt((point1[0] - point2[0])**2 + (point1[1]-point2[1])**2)
 
     def fillNumber(self, num):                      # Fills a square with a number if it results in a legal sudoku board
-        initial = self.board[self.currentSquare[0]][self.currentSquare[1]]
-        self.board[self.currentSquare[0]][self.currentSquare[1]] = num                                        # Try move
-        if not (isLegalSudoku(self.board)):                                                             # Check if legal
-            self.board[self.currentSquare[0]][self.currentSquare[1]] = initial                       # Undo if not legal
+        self.state.place(self.currentSquare[0], self.currentSquare[1], num)                         # Only made if legal
+
+    def newBoard(self, board):                                                            # Starts a game on a new board
+        self.state = boardState(board)
+        self.board = self.state.board
+        self.oBoard = copy.deepcopy(self.board)
+        self.n = len(self.board)                                        # Number of squares along each side of the board
+        self.N = int(math.sqrt(self.n))                                   # Number of squares along each side of a block
+        self.unit = (self.boardDim)/self.n                                  # One square side length on the sudoku board
+        self.overlay = None                                       # Pencil marks surface, redrawn when the board changes
+        self.hint = None                                                           # (board version, hint) from findHint
 
     def text_objects(self, text, font, color):                                       # Creates surface and Rect for text
         textSurface = font.render(str(text), True, color)
@@ -99,23 +116,61 @@ class SudokuOpenCV(object):
     def fillSquare(self, x, y, num, tlCorner, color):          # Fills in a square on the sudoku board at position (x,y)
         if num > 0:
             SudokuOpenCV.showMessage(self, num, (tlCorner[0] + (x + .5)*self.unit, tlCorner[1]
-                                                 + (y + .5)*self.unit), self.width//20, color)
+                                                 + (y + .5)*self.unit), self.width*9//(20*self.n), color)
 
 
     def boardNumbers(self, tlCorner):                                                # Fills in all numbers on the board
         for j in range(len(self.board)):
             for i in range(len(self.board[0])):
-                if self.board[i][j] == self.oBoard[i][j]:         # If number is part of the original board, it is black
+                if self.state.is_given(i, j):                     # If number is part of the original board, it is black
                     SudokuOpenCV.fillSquare(self, i, j, self.board[i][j], tlCorner, self.black)
                 else:                                                                            # Otherwise, it is blue
                     SudokuOpenCV.fillSquare(self, i, j, self.board[i][j], tlCorner, self.blue)
 
-    def checkWin(board):                                            # Checks if every square is filled with a number > 0
-        for i in range(len(board)):
-            for j in range(len(board)):
-                if board[i][j] == 0:
-                    return False
-        return True
+    def drawCandidates(self, tlCorner):                                   # Draws the pencil marks of every empty square
+        if self.overlay is None or self.overlayVersion != self.state.version:                # Only redrawn after a move
+            if self.overlay is None:
+                font = pygame.font.SysFont("Arial", int(self.unit / self.N))
+                self.glyphs = [font.render(str(num), True, self.gray) for num in range(self.n + 1)]
+            self.overlay = pygame.Surface((int(self.boardDim) + 1, int(self.boardDim) + 1), pygame.SRCALPHA)
+            small = self.unit / self.N                                                  # Side length of one pencil mark
+            for i in range(self.n):
+                for j in range(self.n):
+                    mask = self.state.candidates(i, j)
+                    for num in range(1, self.n + 1):
+                        if mask & (1 << num):                               # Each number has its own spot in the square
+                            glyph = self.glyphs[num]
+                            rect = glyph.get_rect()
+                            rect.center = (int(i * self.unit + ((num - 1) % self.N + .5) * small),
+                                           int(j * self.unit + ((num - 1) // self.N + .5) * small))
+                            self.overlay.blit(glyph, rect)
+            self.overlayVersion = self.state.version
+        self.screen.blit(self.overlay, (int(tlCorner[0]), int(tlCorner[1])))
+
+    def findHint(self):                                    # Finds the next forced move unless the board has not changed
+        if self.hint is None or self.hint[0] != self.state.version:
+            self.hint = (self.state.version, self.state.hint(('column', 'row')))        # board[i] is column i on screen
+        self.showCandidates = True
+
+    def showHint(self, tlCorner):                           # Marks the square of the hint and explains why it is forced
+        if self.hint is None or self.hint[0] != self.state.version:              # Hints are dropped once a move is made
+            return
+        if self.hint[1] is None:
+            SudokuOpenCV.showMessage(self, "No forced move, try a guess",
+                                     (self.width // 2, self.height - 2*self.margin), self.width//40, self.red)
+            return
+        i, j, num, reason = self.hint[1]
+        rect = pygame.Rect((int(tlCorner[0] + i * self.unit), int(tlCorner[1] + j * self.unit)),
+                           (int(self.unit) + 1, int(self.unit) + 1))
+        pygame.draw.rect(self.screen, self.green, rect, 3)
+        SudokuOpenCV.fillSquare(self, i, j, num, tlCorner, self.green)
+        lines = [l.strip() for l in reason.replace('. ', '.\n').splitlines()]
+        for k, l in enumerate(reversed(lines)):                                   # Reason is stacked up from the bottom
+            SudokuOpenCV.showMessage(self, l, (self.width // 2, self.height - 2*self.margin - k * self.width//35),
+                                     self.width//40, self.red)
+
+    def checkWin(self):                                             # Checks if every square is filled with a number > 0
+        return self.state.is_complete()
 
     def drawRect(self, x, y, w, h, surface, color):               # Draws a rectangle with the top left corner at (x,y),
         tlCorner = (int(x), int(y))                                                             # width = w, height = h
@@ -143,6 +198,7 @@ class SudokuOpenCV(object):
             4 - Help Screen
             5 - Pause Screen
             6 - Difficulty Selection Screen
+            7 - Scan Screen
             '''
             if self.gameState == 0:                                                                       # Title Screen
                 self.inGame = False
@@ -156,6 +212,10 @@ class SudokuOpenCV(object):
                 startBtnRect = SudokuOpenCV.drawRect(self, self.width*.4, self.height*.6,self.width*.2,
                                                      self.width*.1,self.screen,self.blue)
                 SudokuOpenCV.showMessage(self, "START", startBtnRect.center, self.width//20, self.black)
+                                                                                                     # Makes scan button
+                scanBtnRect = SudokuOpenCV.drawRect(self, self.width*.1, self.height*.6,self.width*.2,
+                                                    self.width*.1,self.screen,self.blue)
+                SudokuOpenCV.showMessage(self, "SCAN", scanBtnRect.center, self.width//20, self.black)
                                                                                                       #Makes help button
                 helpBtnRect = SudokuOpenCV.drawRect(self, self.width*.85, self.height*.1, self.width*.1,
                                                     self.width*.1, self.screen, self. red)
@@ -170,6 +230,9 @@ class SudokuOpenCV(object):
                                                                                # On help button press, go to help screen
                     elif SudokuOpenCV.checkInRect(self, cx, cy, helpBtnRect.topleft, helpBtnRect.bottomright):
                         self.gameState = 4
+                                                                           # On scan button press, go to the scan screen
+                    elif SudokuOpenCV.checkInRect(self, cx, cy, scanBtnRect.topleft, scanBtnRect.bottomright):
+                        self.gameState = 7
 
             elif self.gameState == 1:                                                                    # Sudoku screen
                 self.inGame = True                                                                 # Player is in a game
@@ -178,6 +241,10 @@ class SudokuOpenCV(object):
                 pauseRect1 = SudokuOpenCV.drawRect(self, 0, 0, self.width*.1, self.height*.2, self.screen, self.red)
                 pauseRect2 = SudokuOpenCV.drawRect(self, self.width*.9, 0, self.width*.1, self.height*.2,
                                                    self.screen, self.red)
+                                                                                                     # Makes hint button
+                hintRect = SudokuOpenCV.drawRect(self, 0, self.height*.8, self.width*.1, self.height*.2, self.screen,
+                                                 self.green)
+                SudokuOpenCV.showMessage(self, "Hint", hintRect.center, self.width//30, self.black)
                 touch = 0                          # Keeps track of how many of the pause buttons the player is touching
                 for hand in handList:                                  # Finds center points for each hand on the screen
                     cx, cy = hand[1]
@@ -189,8 +256,8 @@ class SudokuOpenCV(object):
                         relPoxY = cy - tlCorner[1]
                         normX = relPosX / self.boardDim
                         normY = relPoxY / self.boardDim
-                        boardX = int(normX * 9)
-                        boardY = int(normY * 9)
+                        boardX = int(normX * self.n)
+                        boardY = int(normY * self.n)
                         self.currSquareCoord = (tlCorner[0] + boardX * self.unit, tlCorner[1] + boardY * self.unit)
                         SudokuOpenCV.drawRect(self, self.currSquareCoord[0], self.currSquareCoord[1],
                                               self.unit, self.unit, self.screen, self.blue)
@@ -198,19 +265,24 @@ class SudokuOpenCV(object):
                             self.currentSquare = (boardX, boardY)
                             self.currSquareCoord = (tlCorner[0] + boardX * self.unit, tlCorner[1] + boardY * self.unit)
                                                               # Player can only select squares that are originally empty
-                            if self.oBoard[self.currentSquare[0]][self.currentSquare[1]] == 0:
+                            if not self.state.is_given(self.currentSquare[0], self.currentSquare[1]):
                                 self.gameState = 2
 
                     elif SudokuOpenCV.checkInRect(self, cx, cy, pauseRect1.topleft, pauseRect1.bottomright) or \
                          SudokuOpenCV.checkInRect(self, cx, cy, pauseRect2.topleft, pauseRect2.bottomright):
                         touch += 1
+                    elif SudokuOpenCV.checkInRect(self, cx, cy, hintRect.topleft, hintRect.bottomright):
+                        SudokuOpenCV.findHint(self)                        # Shows pencil marks and the next forced move
                 if touch == 2:                                   # If both pause buttons are pressed, go to pause screen
                     self.gameState = 5
 
                 SudokuOpenCV.drawBoard(self)
                 SudokuOpenCV.boardNumbers(self, tlCorner)
+                if self.showCandidates:
+                    SudokuOpenCV.drawCandidates(self, tlCorner)
+                SudokuOpenCV.showHint(self, tlCorner)
 
-                if SudokuOpenCV.checkWin(self.board) == True:              # If the board is full, then go to win screen
+                if SudokuOpenCV.checkWin(self) == True:                    # If the board is full, then go to win screen
                     self.gameState = 3
 
             elif self.gameState == 2:                                                                     # Input screen
@@ -288,7 +360,8 @@ class SudokuOpenCV(object):
                 corresponding to the number you want to input and touch 
                 at least one of the blue circles. Pause by touching both
                 hands to the red squares. Press the back button 
-                to return to the start screen.
+                to return to the start screen. Touch Hint to see the
+                pencil marks and the next forced move.
                 '''
                 lines = info.splitlines()
                 for i, l in enumerate(lines):                # For each line of the info, display the line on the screen
@@ -344,7 +417,7 @@ class SudokuOpenCV(object):
                     elif SudokuOpenCV.checkInRect(self, cx, cy, resumeRect.topleft, resumeRect.bottomright):
                         self.gameState = 1                                 # Resumes game - brings player to play screen
                     elif SudokuOpenCV.checkInRect(self, cx, cy, restartRect.topleft, restartRect.bottomright):
-                        self.board = copy.deepcopy(self.oBoard)                                           # Restart game
+                        self.state.reset()                                                                # Restart game
                         self.gameState = 1                                       # Reset board and return to play screen
                     elif SudokuOpenCV.checkInRect(self, cx, cy, exitRect.topleft, exitRect.bottomright):
                         self.gameState = 0                                          # Exit game - return to start screen
@@ -382,27 +455,54 @@ class SudokuOpenCV(object):
                     pygame.draw.circle(self.screen, self.red, hand[1], 20, 5)
 
                     if SudokuOpenCV.checkInRect(self, cx, cy, easyRect.topleft, easyRect.bottomright) and total == 0:
-                        self.board = sudokuGenerator.main('Easy')       # Use sudoku generator to make random easy board
-                        self.oBoard = copy.deepcopy(self.board)
+                        SudokuOpenCV.newBoard(self, self.pool.get('Easy'))  # Take a random easy board from the puzzle pool
                         self.gameState = 1
                     elif SudokuOpenCV.checkInRect(self, cx, cy, normalRect.topleft, normalRect.bottomright) \
                             and total == 0:
-                        self.board = sudokuGenerator.main('Medium')   # Use sudoku generator to make random normal board
-                        self.oBoard = copy.deepcopy(self.board)
+                        SudokuOpenCV.newBoard(self, self.pool.get('Medium'))  # Take a random normal board from the puzzle pool
                         self.gameState = 1
                     elif SudokuOpenCV.checkInRect(self, cx, cy, hardRect.topleft, hardRect.bottomright) and total == 0:
-                        self.board = sudokuGenerator.main('Hard')       # Use sudoku generator to make random hard board
-                        self.oBoard = copy.deepcopy(self.board)
+                        SudokuOpenCV.newBoard(self, self.pool.get('Hard'))  # Take a random hard board from the puzzle pool
                         self.gameState = 1
                     elif SudokuOpenCV.checkInRect(self, cx, cy, backRect.topleft, backRect.bottomright):
                         self.gameState = 0                                       # Return to start screen on back button
 
+            elif self.gameState == 7:                                                                      # Scan screen
+                read = self.capture.read(self.h.lastFrame)            # (board, solution) once a sudoku is read steadily
+                if self.capture.corners is not None:                   # Outlines the grid found, mirrored like the feed
+                    corners = [(self.width - 1 - x, y) for x, y in self.capture.corners]
+                    pygame.draw.polygon(self.screen, self.green, corners, 3)
+                SudokuOpenCV.showMessage(self, "Hold a printed sudoku up to the camera",
+                                         (self.width//2, self.height*.1), self.width//30, self.white)
+                                                                                                     # Makes back button
+                backRect = SudokuOpenCV.drawRect(self, self.width * .8, self.height * .8, self.width * .1,
+                                                 self.height * .1, self.screen, self.red)
+                SudokuOpenCV.showMessage(self, "Back", backRect.center, self.width // 30, self.black)
+
+                if read:
+                                                        # board[i] is drawn as column i, so the rows read become columns
+                    SudokuOpenCV.newBoard(self, [list(column) for column in zip(*read[0])])
+                    self.gameState = 1
+                for hand in handList:
+                    cx, cy = hand[1]
+                    pygame.draw.circle(self.screen, self.red, hand[1], 20, 5)
+                    if SudokuOpenCV.checkInRect(self, cx, cy, backRect.topleft, backRect.bottomright):
+                        self.gameState = 0                                       # Return to start screen on back button
+
+            stats = self.h.stats() if self.showStats else None
+            if stats is not None:
+                SudokuOpenCV.showMessage(self, "dropped %d of %d, latency %.0f ms (worst %.0f ms)"
+                                         % (stats['dropped'], stats['captured'], stats['latency'],
+                                            stats['worstLatency']), (self.width//2, self.height - 10),
+                                         self.width//40, self.white)
             pygame.display.update()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.h.close()
                     exit()
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:                                   # Closes the game on escape press
+                        self.h.close()
                         exit()
                     elif event.key == pygame.K_SPACE:               # Goes to win screen on space for debugging purposes
                         self.gameState = 3
@@ -419,11 +519,22 @@ class SudokuOpenCV(object):
                                     [2,3,5,7,4,8,9,1,6]
                                     ]
 
-                        self.oBoard = copy.deepcopy(self.board)
+                        SudokuOpenCV.newBoard(self, self.board)
                         self.gameState = 1
+                    elif event.key == pygame.K_u:                                # Takes back the last move on 'u' press
+                        self.state.undo()
                     elif event.key == pygame.K_p:                                             # Pauses game on 'p' press
                         self.gameState = 5
-
-
-game = SudokuOpenCV()
-game.main()
+                    elif event.key == pygame.K_c:                             # Shows or hides pencil marks on 'c' press
+                        self.showCandidates = not self.showCandidates
+                    elif event.key == pygame.K_f:                 # Shows or hides camera drops and latency on 'f' press
+                        self.showStats = not self.showStats
+                    elif event.key == pygame.K_h and self.gameState == 1:      # Shows the next forced move on 'h' press
+                        SudokuOpenCV.findHint(self)
+                    elif event.key == pygame.K_s and not self.inGame:              # Scans a printed sudoku on 's' press
+                        self.gameState = 7
+
+
+if __name__ == '__main__':                                       # The vision process imports this file again on Windows
+    game = SudokuOpenCV(separateProcess='--process' in sys.argv)                        # python sudokugame.py --process
+    game.main()
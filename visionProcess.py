@@ -0,0 +1,108 @@
+# Vision process - runs hand tracking in its own process so that vision and rendering each get a core
+
+# The worker process owns the camera and handTracking. It writes every annotated RGB frame, along with the raw frame
+# the sudoku scanner reads, into one of two shared memory buffers, and sends (buffer, total, handList, stats) over a
+# queue. The game takes the newest result and uses the frame straight from shared memory, without copying it.
+# Each buffer has a lock. The game holds the lock of the buffer it is showing until it takes the next result, and
+# the worker writes into whichever buffer the game is not holding, so a frame is never overwritten while in use.
+
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from handtrackingclass import handTracking
+
+def work(results, locks, stop, options):
+    h = handTracking(**options)
+    width, height = h.getScreenSize()
+    shape = (2, 2, height, width, 3)                                     # Buffer, then annotated RGB frame or raw frame
+    memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    frames = np.ndarray(shape, np.uint8, buffer=memory.buf)
+    results.put((memory.name, (width, height)))
+    last = 1
+    try:
+        while not stop.is_set():
+            frame, thresh, total, handList = h.loop()
+            # The game holds at most one lock, so one of these is free. If it is showing the older frame, the
+            # newer one is replaced
+            index = 1 - last
+            while not locks[index].acquire(False):
+                index = 1 - index
+                time.sleep(.001)
+            try:
+                frames[index, 0] = frame
+                frames[index, 1] = h.lastFrame
+            finally:
+                locks[index].release()
+            last = index
+            results.put((index, total, handList, h.stats()))
+    finally:
+        del frames
+        memory.close()
+        memory.unlink()
+
+class visionProcess(object):
+    """ Runs handTracking in a worker process and has the same getScreenSize, loop, lastFrame and stats as
+        handTracking itself, so the game can use either. options are passed on to handTracking"""
+    def __init__(self, **options):
+        context = multiprocessing.get_context('spawn')                         # The camera is opened in a fresh process
+        self.results = context.Queue()
+        self.locks = [context.Lock(), context.Lock()]
+        self.stop = context.Event()
+        self.process = context.Process(target=work, args=(self.results, self.locks, self.stop, options),
+                                       name='visionProcess', daemon=True)
+        self.process.start()
+        while True:
+            try:
+                name, self.screenSize = self.results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError('the vision process exited before opening the camera')
+        self.memory = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((2, 2, self.screenSize[1], self.screenSize[0], 3), np.uint8, buffer=self.memory.buf)
+        self.held = None                                                               # Index of the buffer being shown
+        self.result = None
+        self.latest = None
+        self.lastFrame = None
+
+    def getScreenSize(self):
+        return self.screenSize
+
+    def loop(self):
+        """ Returns the newest result as handTracking.loop does, but with no threshold image. The frame is a view
+            of shared memory and stays valid until the next call. If no new result has come since the last call
+            the last one is returned again, so the game never waits on vision except for the very first frame"""
+        result = self.result or self.results.get()
+        try:
+            while True:                                                  # Results the game was too slow for are skipped
+                result = self.results.get_nowait()
+        except queue.Empty:
+            pass
+        self.result = result
+        index, total, handList, self.latest = result
+        if self.held != index:
+            if self.held is not None:
+                self.locks[self.held].release()
+            self.locks[index].acquire()
+            self.held = index
+        self.lastFrame = self.frames[index, 1]
+        return self.frames[index, 0], None, total, handList
+
+    def stats(self):
+        """ Returns the camera statistics of the worker's handTracking as of the last result"""
+        return self.latest
+
+    def close(self):
+        """ Stops the worker process and detaches from its shared memory"""
+        if self.held is not None:
+            self.locks[self.held].release()
+            self.held = None
+        self.stop.set()
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.lastFrame = None
+        del self.frames
+        self.memory.close()